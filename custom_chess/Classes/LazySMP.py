@@ -0,0 +1,65 @@
+import os
+from array import array
+from custom_chess.Classes.chessEngine import Gamestate
+from custom_chess.Classes.SearchWorker import SearchWorker
+from custom_chess.Classes.TimeManager import TimeManager
+from custom_chess.Classes.TranspositionTable import SharedTranspositionTable
+from custom_chess.Classes import chessIA
+
+
+class LazySMP:
+    # The calling process searches the root as usual while threads - 1 helper processes search the same root
+    # through a shared transposition table. Helpers order the root randomly and every other one aims one depth
+    # deeper, so they fill the table with different parts of the tree for the main search to pick up.
+
+    def __init__(self, searcher: chessIA.Searcher, threads: int = 2, size_mb: float = chessIA.TT_SIZE_MB):
+        self.searcher = searcher
+        self.table = SharedTranspositionTable(size_mb)
+        searcher.transpositionTable = self.table
+        tablebase_path = searcher.tablebase.directory if searcher.tablebase is not None else None
+        # a helper without a core of its own only takes time from the main search, so there are never more
+        # processes than cores
+        self.helpers = [SearchWorker(shared_table=self.table, tablebase_path=tablebase_path)
+                        for _ in range(min(threads, os.cpu_count() or 1) - 1)]
+        self.fen = None
+
+    def search(self, gamestate: Gamestate, validmoves: array, max_depth: int = chessIA.DEPTH,
+               timer: TimeManager = None, info_callback=None, fen: str = None, use_pvs: bool = False):
+        # book and tablebase moves are played without waking the helpers, which could otherwise outvote them
+        root = self.searcher.probe_root(gamestate, validmoves)
+        if root is not None:
+            if info_callback is not None:
+                info_callback(0, root[1], 0, 0.0, [root[0]])
+            return root[0]
+        # a new game starts from an empty table, cleared here before any helper is searching again
+        if fen != self.fen:
+            self.table.clear()
+            self.fen = fen
+        for i, helper in enumerate(self.helpers):
+            helper.search(gamestate, max_depth + i % 2, None, fen, use_pvs)
+        completed_depth = 0
+
+        def on_iteration(depth, score, nodes, elapsed, pv):
+            nonlocal completed_depth
+            completed_depth = depth
+            for helper in self.helpers:
+                while helper.poll() is not None:
+                    pass
+                if helper.lastInfo is not None:
+                    nodes += helper.lastInfo[3]
+            if info_callback is not None:
+                info_callback(depth, score, nodes, elapsed, pv)
+
+        best_move = self.searcher.find_move_iterative(gamestate, validmoves, max_depth, timer, on_iteration, use_pvs)
+        # a helper that finished a deeper iteration than the main search has the better move
+        for helper in self.helpers:
+            helper_move = helper.stop()
+            if helper_move is not None and helper.lastInfo is not None and helper.lastInfo[1] > completed_depth:
+                best_move = helper_move
+                completed_depth = helper.lastInfo[1]
+        return best_move
+
+    def close(self):
+        for helper in self.helpers:
+            helper.close()
+        self.helpers = []
@@ -1,3 +1,31 @@
+# A move is packed into 16 bits: start square in bits 0-5, end square in bits 6-11 and the flag in bits 12-15,
+# with square = row * 8 + col. Move objects are only built from these codes for the GUI and notation.
+QUIET = 0
+DOUBLE_PAWN_PUSH = 1
+KING_CASTLE = 2
+QUEEN_CASTLE = 3
+CAPTURE = 4
+ENPASSANT = 5
+PROMOTION = 8
+# promotion flags are PROMOTION | index in PROMOTION_PIECES, plus CAPTURE when taking a piece
+PROMOTION_PIECES = "NBRQ"
+
+
+def encode_move(start_sq: int, end_sq: int, flag: int = QUIET) -> int:
+    return start_sq | end_sq << 6 | flag << 12
+
+
+def move_start(code: int) -> int:
+    return code & 63
+
+
+def move_end(code: int) -> int:
+    return (code >> 6) & 63
+
+
+def move_flag(code: int) -> int:
+    return code >> 12
+
 
 class Move:
 
@@ -6,7 +34,7 @@ class Move:
     filesToCols = {"a": 0, "b": 1, "c": 2, "d": 3, "e": 4, "f": 5, "g": 6, "h": 7}
     colsToFiles = {v: k for k, v in filesToCols.items()}
 
-    def __init__(self, start_cord, end_cord, board, enpassant_move=False, is_castle_move=False):
+    def __init__(self, start_cord, end_cord, board, enpassant_move=False, is_castle_move=False, promotion_choice="Q"):
         self.startRow = start_cord[0]
         self.startCol = start_cord[1]
         self.endRow = end_cord[0]
@@ -16,7 +44,7 @@ class Move:
         self.moveID = self.startRow * 1000 + self.startCol * 100 + self.endRow * 10 + self.endCol
         self.isPawnPromotion = False
         self.isCastleMove = is_castle_move
-        self.promotionChoice = "Q"
+        self.promotionChoice = promotion_choice
         self.isenpassantMove = enpassant_move
         if self.pieceMoved == "wp" and self.endRow == 0:
             self.isPawnPromotion = True
@@ -26,13 +54,35 @@ class Move:
         if enpassant_move:
             self.pieceCaptured = board[self.startRow][self.endCol]
 
+        if is_castle_move:
+            flag = KING_CASTLE if self.endCol > self.startCol else QUEEN_CASTLE
+        elif enpassant_move:
+            flag = ENPASSANT
+        else:
+            flag = CAPTURE if self.pieceCaptured != "__" else QUIET
+            if self.isPawnPromotion:
+                flag |= PROMOTION | PROMOTION_PIECES.index(promotion_choice)
+            elif self.pieceMoved[1] == "p" and abs(self.endRow - self.startRow) == 2:
+                flag = DOUBLE_PAWN_PUSH
+        self.code = encode_move(self.startRow * 8 + self.startCol, self.endRow * 8 + self.endCol, flag)
+
+    @classmethod
+    def from_code(cls, code: int, board):
+        flag = move_flag(code)
+        return cls(divmod(move_start(code), 8), divmod(move_end(code), 8), board, enpassant_move=flag == ENPASSANT,
+                   is_castle_move=flag in (KING_CASTLE, QUEEN_CASTLE),
+                   promotion_choice=PROMOTION_PIECES[flag & 3] if flag & PROMOTION else "Q")
+
     def __eq__(self, other):
         if isinstance(other, Move):
             return self.moveID == other.moveID
         return False
 
     def get_chess_notation(self) -> list:
-        return self.get_rank_file(self.startRow, self.startCol) + self.get_rank_file(self.endRow, self.endCol)
+        notation = self.get_rank_file(self.startRow, self.startCol) + self.get_rank_file(self.endRow, self.endCol)
+        if self.isPawnPromotion:
+            notation += self.promotionChoice.lower()
+        return notation
 
     def get_rank_file(self, row: int, col: int) -> list:
         return self.colsToFiles[col] + self.rowsToRanks[row]
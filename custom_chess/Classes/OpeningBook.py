@@ -0,0 +1,69 @@
+import mmap
+import random
+import struct
+from custom_chess.Classes.MoveClass import KING_CASTLE, QUEEN_CASTLE, PROMOTION
+
+# a Polyglot entry is key (8 bytes), move (2), weight (2) and learn (4), big-endian and sorted by key
+ENTRY = struct.Struct(">QHHI")
+KEY = struct.Struct(">Q")
+
+
+def polyglot_move(code: int) -> int:
+    # Polyglot squares count ranks from white's side and castling is written as the king taking its own rook
+    start_row, start_col = divmod(code & 63, 8)
+    end_row, end_col = divmod((code >> 6) & 63, 8)
+    flag = code >> 12
+    if flag == KING_CASTLE:
+        end_col = 7
+    elif flag == QUEEN_CASTLE:
+        end_col = 0
+    promotion = (flag & 3) + 1 if flag & PROMOTION else 0
+    return end_col | (7 - end_row) << 3 | start_col << 6 | (7 - start_row) << 9 | promotion << 12
+
+
+class OpeningBook:
+    # The file is memory-mapped and searched in place, so opening a large book costs nothing up front
+
+    def __init__(self, path: str):
+        self.file = open(path, "rb")
+        self.size = self.file.seek(0, 2) // ENTRY.size
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+
+    def key_at(self, index: int) -> int:
+        return KEY.unpack_from(self.data, index * ENTRY.size)[0]
+
+    def find_entries(self, key: int) -> list:
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self.key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        entries = []
+        while low < self.size:
+            entry_key, move, weight, learn = ENTRY.unpack_from(self.data, low * ENTRY.size)
+            if entry_key != key:
+                break
+            entries.append((move, weight))
+            low += 1
+        return entries
+
+    def get_moves(self, gamestate) -> list:
+        # book entries for the position as (move code, weight), anything that is not legal here is dropped
+        entries = self.find_entries(gamestate.zobristKey)
+        if not entries:
+            return []
+        legal = {polyglot_move(code): code for code in gamestate.get_valid_moves_efficient()}
+        return [(legal[move], weight) for move, weight in entries if move in legal]
+
+    def choose_move(self, gamestate, rng=random):
+        moves = [(code, weight) for code, weight in self.get_moves(gamestate) if weight > 0]
+        if not moves:
+            return None
+        return rng.choices([code for code, weight in moves], weights=[weight for code, weight in moves])[0]
+
+    def close(self):
+        if self.size:
+            self.data.close()
+        self.file.close()
@@ -0,0 +1,67 @@
+import json
+
+
+def rate(part: int, whole: int) -> float:
+    return part / whole if whole else 0.0
+
+
+class SearchStats:
+    # Figures of one search. nodes counts every node, quiescence ones included. qnodes and the hash and cutoff
+    # counts are only kept while per-node counting is on, the per-depth records always are.
+
+    def __init__(self, detailed: bool = True):
+        self.detailed = detailed
+        self.nodes = 0
+        self.qnodes = 0
+        self.ttProbes = 0
+        self.ttHits = 0
+        self.ttCutoffs = 0
+        self.betaCutoffs = 0
+        self.firstMoveCutoffs = 0
+        self.iterations = []
+        self.bestMove = None
+        self.depth = 0
+        self.score = None
+        self.pv = []
+        self.elapsed = 0.0
+
+    def complete_iteration(self, depth: int, score: float, nodes: int, elapsed: float, pv: list) -> dict:
+        # nodes and elapsed are totals since the search started, the record keeps what this depth added
+        previous = self.iterations[-1] if self.iterations else None
+        done_nodes = sum(iteration["nodes"] for iteration in self.iterations)
+        done_qnodes = sum(iteration["qnodes"] for iteration in self.iterations)
+        done_time = sum(iteration["time"] for iteration in self.iterations)
+        iteration = {"depth": depth, "score": score, "nodes": nodes - done_nodes, "qnodes": self.qnodes - done_qnodes,
+                     "time": elapsed - done_time, "pv": pv}
+        iteration["nps"] = int(iteration["nodes"] / max(iteration["time"], 1e-6))
+        iteration["time"] = round(iteration["time"], 4)
+        # effective branching factor: how many times more nodes this depth took than the one before
+        iteration["branching"] = round(rate(iteration["nodes"], previous["nodes"]), 2) if previous else None
+        self.iterations.append(iteration)
+        self.depth = depth
+        self.score = score
+        self.pv = pv
+        return iteration
+
+    def finish(self, best_move: int, nodes: int, elapsed: float) -> None:
+        self.bestMove = best_move
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+    @property
+    def nps(self) -> int:
+        return int(self.nodes / max(self.elapsed, 1e-6))
+
+    def to_dict(self) -> dict:
+        data = {"depth": self.depth, "score": self.score, "nodes": self.nodes, "time": round(self.elapsed, 4),
+                "nps": self.nps, "pv": self.pv, "iterations": self.iterations}
+        if self.detailed:
+            data.update({"qnodes": self.qnodes, "tt_hit_rate": round(rate(self.ttHits, self.ttProbes), 4),
+                         "tt_cutoff_rate": round(rate(self.ttCutoffs, self.ttProbes), 4),
+                         "first_move_cutoff_rate": round(rate(self.firstMoveCutoffs, self.betaCutoffs), 4)})
+        return data
+
+    def write(self, file, **fields) -> None:
+        # one JSON line per search, fields are written in front of the figures (the position, a label...)
+        file.write(json.dumps({**fields, **self.to_dict()}) + "\n")
+        file.flush()
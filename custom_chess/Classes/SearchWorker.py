@@ -0,0 +1,122 @@
+from multiprocessing import Process, Queue, Event
+from queue import Empty
+from custom_chess.Classes.chessEngine import Gamestate
+from custom_chess.Classes.TimeManager import TimeManager
+from custom_chess.Classes.TranspositionTable import SharedTranspositionTable
+from custom_chess.Classes import chessIA
+
+
+def run_worker(requests: Queue, results: Queue, stop_event, shared_table: tuple = None, book_path: str = None,
+               tablebase_path: str = None):
+    # the worker mirrors the game from move deltas, its searcher with the transposition table and killers lives as
+    # long as it does
+    searcher = chessIA.Searcher(transposition_table=SharedTranspositionTable(*shared_table)) \
+        if shared_table is not None else chessIA.Searcher()
+    searcher.load_opening_book(book_path)
+    searcher.load_tablebase(tablebase_path)
+    gamestate = Gamestate()
+    while True:
+        request = requests.get()
+        command = request[0]
+        if command == "quit":
+            break
+        elif command == "position":
+            gamestate = Gamestate.from_fen(request[1]) if request[1] else Gamestate()
+            # a shared table belongs to the process that made it, which clears it while nobody is searching
+            if shared_table is None:
+                searcher.transpositionTable.clear()
+        elif command == "moves":
+            for move in request[1]:
+                gamestate.make_move(move)
+        elif command == "undo":
+            for _ in range(request[1]):
+                gamestate.undo_move()
+        elif command == "search":
+            max_depth, movetime, use_pvs = request[1], request[2], request[3]
+            timer = TimeManager(stop_event=stop_event) if movetime is None else \
+                TimeManager.from_movetime(movetime, stop_event)
+            validmoves = gamestate.get_valid_moves_efficient()
+            best_move = None
+            if validmoves:
+                best_move = searcher.find_move_iterative(gamestate, validmoves, max_depth, timer,
+                                                         info_callback=lambda *info: results.put(("info",) + info),
+                                                         use_pvs=use_pvs)
+            results.put(("bestmove", best_move))
+
+
+class SearchWorker:
+
+    def __init__(self, fen: str = None, shared_table: SharedTranspositionTable = None, book_path: str = None,
+                 tablebase_path: str = None):
+        self.requests = Queue()
+        self.results = Queue()
+        self.stopEvent = Event()
+        self.fen = fen
+        self.sentMoves = []
+        self.searching = False
+        self.lastInfo = None
+        self.bestMove = None
+        if shared_table is not None:
+            shared_table = (shared_table.size_mb, shared_table.buffer)
+        self.process = Process(target=run_worker, args=(self.requests, self.results, self.stopEvent, shared_table,
+                                                        book_path, tablebase_path),
+                               daemon=True)
+        self.process.start()
+        if fen:
+            self.requests.put(("position", fen))
+
+    def new_game(self, fen: str = None):
+        self.stop()
+        self.fen = fen
+        self.sentMoves = []
+        self.requests.put(("position", fen))
+
+    def sync(self, gamestate: Gamestate):
+        # only send what changed since the last sync: takebacks first, then the new moves
+        common = 0
+        while common < min(len(self.sentMoves), len(gamestate.moveLog)) and \
+                self.sentMoves[common] == gamestate.moveLog[common]:
+            common += 1
+        if common < len(self.sentMoves):
+            self.requests.put(("undo", len(self.sentMoves) - common))
+        if common < len(gamestate.moveLog):
+            self.requests.put(("moves", list(gamestate.moveLog[common:])))
+        self.sentMoves = list(gamestate.moveLog)
+
+    def search(self, gamestate: Gamestate, max_depth: int = chessIA.DEPTH, movetime: float = chessIA.SEARCH_TIME,
+               fen: str = None, use_pvs: bool = False):
+        # movetime None searches until stop()
+        self.stop()
+        if fen != self.fen:
+            self.new_game(fen)
+        self.sync(gamestate)
+        self.stopEvent.clear()
+        self.searching = True
+        self.lastInfo = None
+        self.bestMove = None
+        self.requests.put(("search", max_depth, movetime, use_pvs))
+
+    def poll(self, block: bool = False):
+        # returns the next ("info", depth, score, nodes, elapsed, pv) or ("bestmove", move) message, or None
+        try:
+            message = self.results.get(block)
+        except Empty:
+            return None
+        if message[0] == "info":
+            self.lastInfo = message
+        elif message[0] == "bestmove":
+            self.searching = False
+            self.bestMove = message[1]
+        return message
+
+    def stop(self):
+        if self.searching:
+            self.stopEvent.set()
+            while self.poll(block=True)[0] != "bestmove":
+                pass
+        return self.bestMove
+
+    def close(self):
+        self.stop()
+        self.requests.put(("quit",))
+        self.process.join()
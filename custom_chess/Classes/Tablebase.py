@@ -0,0 +1,115 @@
+import mmap
+import os
+import struct
+import zlib
+from array import array
+from collections import OrderedDict
+
+# A table stores one signed byte per position: +n the side to move mates in n plies, -(n + 1) it is mated in n
+# plies, 0 a draw or an impossible position. The bytes are cut in zlib-compressed blocks behind an offset index.
+MAGIC = b"CVTB"
+BLOCK_ENTRIES = 4096
+CACHE_BLOCKS = 256
+TABLE_EXTENSION = ".tb"
+# the pieces next to the two kings that have a table, always given to white, black's are probed mirrored
+TABLE_PIECES = "QRp"
+TABLE_SIZE = 2 * 64 * 64 * 64
+
+
+def table_index(black_to_move: int, white_king: int, black_king: int, square: int) -> int:
+    return ((black_to_move * 64 + white_king) * 64 + black_king) * 64 + square
+
+
+def table_name(piece: str) -> str:
+    return f"K{piece.upper()}K"
+
+
+def write_table(path: str, values: array) -> None:
+    data = values.tobytes()
+    blocks = [zlib.compress(data[i:i + BLOCK_ENTRIES], 9) for i in range(0, len(data), BLOCK_ENTRIES)]
+    offsets = array("I", [0])
+    for block in blocks:
+        offsets.append(offsets[-1] + len(block))
+    with open(path, "wb") as file:
+        file.write(MAGIC + struct.pack("<I", len(blocks)))
+        file.write(offsets.tobytes())
+        file.write(b"".join(blocks))
+
+
+class Tablebase:
+    # Every table file in the directory is memory-mapped, a probe only inflates the block it falls in and the
+    # most recently used blocks are kept across probes
+
+    def __init__(self, directory: str, cache_blocks: int = CACHE_BLOCKS):
+        self.directory = directory
+        self.cacheBlocks = cache_blocks
+        self.cache = OrderedDict()
+        self.files = {}
+        self.tables = {}
+        for piece in TABLE_PIECES:
+            path = os.path.join(directory, table_name(piece) + TABLE_EXTENSION)
+            if os.path.isfile(path):
+                self.open_table(table_name(piece), path)
+        self.maxPieces = 3 if self.tables else 2
+        self.hits = 0
+        self.misses = 0
+
+    def open_table(self, name: str, path: str) -> None:
+        file = open(path, "rb")
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if data[:4] != MAGIC:
+            data.close()
+            file.close()
+            raise ValueError(f"{path} is not a tablebase file")
+        count = struct.unpack_from("<I", data, 4)[0]
+        offsets = array("I", data[8:8 + 4 * (count + 1)])
+        self.files[name] = file
+        self.tables[name] = (data, offsets, 8 + 4 * (count + 1))
+
+    def read(self, name: str, index: int) -> int:
+        block_number, position = divmod(index, BLOCK_ENTRIES)
+        block = self.cache.get((name, block_number))
+        if block is None:
+            self.misses += 1
+            data, offsets, start = self.tables[name]
+            block = array("b", zlib.decompress(data[start + offsets[block_number]:start + offsets[block_number + 1]]))
+            self.cache[(name, block_number)] = block
+            if len(self.cache) > self.cacheBlocks:
+                self.cache.popitem(last=False)
+        else:
+            self.hits += 1
+            self.cache.move_to_end((name, block_number))
+        return block[position]
+
+    def probe(self, gamestate):
+        # the stored value for the position or None when there are too many pieces or no table for them
+        pieces = []
+        for row, line in enumerate(gamestate.board):
+            for col, piece in enumerate(line):
+                if piece != "__":
+                    if len(pieces) == self.maxPieces:
+                        return None
+                    pieces.append((piece, row * 8 + col))
+        kings = {piece: square for piece, square in pieces if piece[1] == "K"}
+        others = [(piece, square) for piece, square in pieces if piece[1] != "K"]
+        if not others:
+            return 0
+        (piece, square), = others
+        if piece[1] in "NB":
+            return 0
+        name = table_name(piece[1])
+        if name not in self.tables:
+            return None
+        black_to_move = 0 if gamestate.whiteToMove else 1
+        if piece[0] == "w":
+            return self.read(name, table_index(black_to_move, kings["wK"], kings["bK"], square))
+        return self.read(name, table_index(1 - black_to_move, kings["bK"] ^ 56, kings["wK"] ^ 56, square ^ 56))
+
+    def close(self):
+        for data, offsets, start in self.tables.values():
+            data.close()
+        for file in self.files.values():
+            file.close()
+        self.tables = {}
+        self.files = {}
+        self.cache.clear()
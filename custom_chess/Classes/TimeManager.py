@@ -0,0 +1,51 @@
+import time
+
+CHECK_INTERVAL = 256
+MOVE_OVERHEAD = 0.05
+DEFAULT_MOVES_TO_GO = 30
+
+
+class TimeManager:
+    # softLimit: no new depth is started after it, hardLimit: the running depth is aborted. Nothing is aborted
+    # while armed is off, the search keeps it off for depth 1 so there is always a move to play.
+
+    def __init__(self, soft_limit: float = float("inf"), hard_limit: float = float("inf"), stop_event=None,
+                 check_interval: int = CHECK_INTERVAL):
+        self.softLimit = soft_limit
+        self.hardLimit = hard_limit
+        self.stopEvent = stop_event
+        self.checkInterval = check_interval
+        self.startTime = time.perf_counter()
+        self.stopped = False
+        self.armed = True
+
+    @classmethod
+    def from_movetime(cls, movetime: float, stop_event=None):
+        limit = max(movetime - MOVE_OVERHEAD, 0.01)
+        return cls(limit, limit, stop_event)
+
+    @classmethod
+    def from_clock(cls, remaining: float, increment: float = 0, moves_to_go: int = DEFAULT_MOVES_TO_GO,
+                   stop_event=None):
+        # spend an even share of the clock plus most of the increment, never more than a quarter of what is left
+        remaining = max(remaining - MOVE_OVERHEAD, 0.01)
+        budget = min(remaining / max(moves_to_go, 1) + increment * 0.75, remaining / 4)
+        return cls(budget / 2, min(budget * 2, remaining / 4), stop_event)
+
+    def start(self):
+        self.startTime = time.perf_counter()
+        self.stopped = False
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.startTime
+
+    def should_stop(self, nodes: int) -> bool:
+        if self.armed and not self.stopped and nodes % self.checkInterval == 0:
+            if self.elapsed() >= self.hardLimit or (self.stopEvent is not None and self.stopEvent.is_set()):
+                self.stopped = True
+        return self.stopped
+
+    def can_start_iteration(self) -> bool:
+        if self.stopEvent is not None and self.stopEvent.is_set():
+            self.stopped = True
+        return not self.stopped and self.elapsed() < self.softLimit
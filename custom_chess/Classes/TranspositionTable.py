@@ -0,0 +1,96 @@
+from array import array
+from multiprocessing import RawArray
+
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+# key (stored xor the check word), centipawn score, depth, flag, generation and the 16-bit move code
+ENTRY_SIZE = 8 + 4 + 1 + 1 + 1 + 2
+
+
+def check_word(depth: int, flag: int, generation: int, move: int, score: int) -> int:
+    # the rest of an entry folded into 64 bits, a probe only matches when every field is the one stored with the key
+    return (score & 0xFFFFFFFF | (depth & 0xFF) << 32 | flag << 40 | move << 42) ^ generation << 56
+
+
+class TranspositionTable:
+    # Buckets of two slots: slot 0 keeps the deepest result of the current search, slot 1 always takes the newest
+
+    def __init__(self, size_mb: float = 16):
+        self.size_mb = size_mb
+        self.buckets = max(1, int(size_mb * 1024 * 1024) // (2 * ENTRY_SIZE))
+        slots = 2 * self.buckets
+        self.keys = array("Q", bytes(8 * slots))
+        self.scores = array("i", bytes(4 * slots))
+        self.depths = array("b", [-1]) * slots
+        self.flags = array("B", bytes(slots))
+        self.generations = array("B", bytes(slots))
+        self.moves = array("H", bytes(2 * slots))
+        self.generation = 0
+
+    def new_search(self) -> None:
+        self.generation = (self.generation + 1) & 0xFF
+
+    def clear(self) -> None:
+        self.__init__(self.size_mb)
+
+    def read_slot(self, slot: int) -> tuple:
+        # every field is read once and the key recovered from them, so fields torn by a concurrent store give back a
+        # key that matches nothing
+        depth, flag, score, move = self.depths[slot], self.flags[slot], self.scores[slot], self.moves[slot]
+        return self.keys[slot] ^ check_word(depth, flag, self.generations[slot], move, score), depth, flag, score, move
+
+    def probe(self, key: int):
+        slot = (key % self.buckets) * 2
+        stored_key, depth, flag, score, move = self.read_slot(slot)
+        if stored_key == key and depth >= 0:
+            return depth, flag, score, move
+        stored_key, depth, flag, score, move = self.read_slot(slot + 1)
+        if stored_key == key and depth >= 0:
+            return depth, flag, score, move
+        return None
+
+    def store(self, key: int, depth: int, flag: int, score: int, move: int) -> None:
+        slot = (key % self.buckets) * 2
+        if depth < self.depths[slot] and self.generations[slot] == self.generation:
+            slot += 1
+        if not move:
+            stored = self.read_slot(slot)
+            move = stored[4] if stored[0] == key else 0
+        self.scores[slot] = score
+        self.depths[slot] = depth
+        self.flags[slot] = flag
+        self.generations[slot] = self.generation
+        self.moves[slot] = move
+        self.keys[slot] = key ^ check_word(depth, flag, self.generation, move, score)
+
+
+class SharedTranspositionTable(TranspositionTable):
+    # Same layout inside one RawArray so search processes started with it share entries. Writes are not locked:
+    # the key is written last and xor the check word of the other fields, so an entry half overwritten by another
+    # process reads as a miss instead of a wrong cutoff.
+
+    def __init__(self, size_mb: float = 16, buffer=None):
+        self.size_mb = size_mb
+        self.buckets = max(1, int(size_mb * 1024 * 1024) // (2 * ENTRY_SIZE))
+        slots = 2 * self.buckets
+        created = buffer is None
+        if created:
+            buffer = RawArray("B", ENTRY_SIZE * slots)
+        self.buffer = buffer
+        view = memoryview(buffer).cast("B")
+        self.keys = view[:8 * slots].cast("Q")
+        self.scores = view[8 * slots:12 * slots].cast("i")
+        self.depths = view[12 * slots:13 * slots].cast("b")
+        self.flags = view[13 * slots:14 * slots].cast("B")
+        self.generations = view[14 * slots:15 * slots].cast("B")
+        self.moves = view[15 * slots:17 * slots].cast("H")
+        self.generation = 0
+        if created:
+            self.depths[:] = array("b", [-1]) * slots
+
+    def clear(self) -> None:
+        slots = 2 * self.buckets
+        view = memoryview(self.buffer).cast("B")
+        view[:] = bytes(len(view))
+        self.depths[:] = array("b", [-1]) * slots
@@ -0,0 +1,45 @@
+import numpy as np
+from custom_chess.Classes.pieceSquareTables import PIECE_SQUARE_SCORES, piece_score
+
+# one int8 plane of 64 squares per piece type, square = row * 8 + col as on the Gamestate board
+PLANE_PIECES = np.array(["wp", "wN", "wB", "wR", "wQ", "wK", "bp", "bN", "bB", "bR", "bQ", "bK"])
+PIECE_SQUARE_MATRIX = np.array([PIECE_SQUARE_SCORES[piece] for piece in PLANE_PIECES], dtype=np.int32)
+MATERIAL_MATRIX = np.array([[(100 if piece[0] == "w" else -100) * piece_score[piece[1]]] * 64
+                            for piece in PLANE_PIECES], dtype=np.int32)
+
+
+def encode_boards(boards) -> np.ndarray:
+    # (N, 8, 8) piece strings to (N, 12, 64) int8 planes in one comparison
+    boards = np.asarray(boards).reshape(-1, 1, 64)
+    return (boards == PLANE_PIECES[None, :, None]).astype(np.int8)
+
+
+def encode_positions(positions) -> np.ndarray:
+    # accepts Gamestates (either engine), boards, a stacked (N, 8, 8) board array or ready (N, 12, 64) planes
+    if isinstance(positions, np.ndarray):
+        if positions.dtype == np.int8:
+            return positions.reshape(-1, 12, 64)
+        return encode_boards(positions)
+    return encode_boards([getattr(position, "board", position) for position in positions])
+
+
+def encode_children(gamestate, moves) -> np.ndarray:
+    boards = np.empty((len(moves), 8, 8), dtype="<U2")
+    for i, move in enumerate(moves):
+        gamestate.make_move(move)
+        boards[i] = gamestate.board
+        gamestate.undo_move()
+    return encode_boards(boards)
+
+
+def evaluate_batch(positions, material_only: bool = False) -> np.ndarray:
+    # centipawns from white's side, the vector form of Gamestate.boardScore (or scoreboard_simple when material_only)
+    planes = encode_positions(positions)
+    matrix = MATERIAL_MATRIX if material_only else PIECE_SQUARE_MATRIX
+    return np.einsum("nps,ps->n", planes, matrix, dtype=np.int32)
+
+
+def evaluate_children(gamestate, moves, material_only: bool = False) -> np.ndarray:
+    # scores of every child from the side to move at the parent, ready to sort moves by
+    scores = evaluate_batch(encode_children(gamestate, moves), material_only)
+    return scores if gamestate.whiteToMove else -scores
@@ -0,0 +1,458 @@
+from array import array
+from custom_chess.Classes.MoveClass import encode_move, QUIET, DOUBLE_PAWN_PUSH, KING_CASTLE, QUEEN_CASTLE, CAPTURE, \
+    ENPASSANT, PROMOTION, PROMOTION_PIECES
+from custom_chess.Classes.chessNotation import parse_fen
+from custom_chess.Classes.pieceSquareTables import compute_score, move_score
+from custom_chess.Classes.zobristKeys import PIECE_KEYS, WHITE_TO_MOVE_KEY, CASTLING_KEYS, enpassant_key, compute_key
+from custom_chess.Classes.stateStack import WHITE_KING_CASTLE, WHITE_QUEEN_CASTLE, BLACK_KING_CASTLE, \
+    BLACK_QUEEN_CASTLE, ALL_CASTLING, CASTLE_MASK, ENPASSANT_SQUARES, ENPASSANT_CODES, castle_bits
+from custom_chess.Classes.gamestateMixin import GamestateMixin
+
+# Square index is row * 8 + col with row 0 being the 8th rank, the same layout as Gamestate.board
+PIECES = ["wp", "wN", "wB", "wR", "wQ", "wK", "bp", "bN", "bB", "bR", "bQ", "bK"]
+PIECE_INDEX = {piece: index for index, piece in enumerate(PIECES)}
+WHITE = 0
+BLACK = 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+FULL_BOARD = (1 << 64) - 1
+PROMOTION_SQUARES = 0xFF | 0xFF << 56
+
+START_BOARD = [["bR", "bN", "bB", "bQ", "bK", "bB", "bN", "bR"],
+               ["bp", "bp", "bp", "bp", "bp", "bp", "bp", "bp"],
+               ["__", "__", "__", "__", "__", "__", "__", "__"],
+               ["__", "__", "__", "__", "__", "__", "__", "__"],
+               ["__", "__", "__", "__", "__", "__", "__", "__"],
+               ["__", "__", "__", "__", "__", "__", "__", "__"],
+               ["wp", "wp", "wp", "wp", "wp", "wp", "wp", "wp"],
+               ["wR", "wN", "wB", "wQ", "wK", "wB", "wN", "wR"]]
+
+
+def _build_leaper_table(offsets: tuple) -> list[int]:
+    table = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        mask = 0
+        for d_row, d_col in offsets:
+            end_row = row + d_row
+            end_col = col + d_col
+            if 0 <= end_row < 8 and 0 <= end_col < 8:
+                mask |= 1 << (end_row * 8 + end_col)
+        table.append(mask)
+    return table
+
+
+def _build_ray_table(direction: tuple) -> list[int]:
+    table = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        mask = 0
+        for k in range(1, 8):
+            end_row = row + direction[0] * k
+            end_col = col + direction[1] * k
+            if not (0 <= end_row < 8 and 0 <= end_col < 8):
+                break
+            mask |= 1 << (end_row * 8 + end_col)
+        table.append(mask)
+    return table
+
+
+def _build_between_table() -> list[list[int]]:
+    table = [[0] * 64 for _ in range(64)]
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        for direction in ROOK_DIRECTIONS + BISHOP_DIRECTIONS:
+            mask = 0
+            for k in range(1, 8):
+                end_row = row + direction[0] * k
+                end_col = col + direction[1] * k
+                if not (0 <= end_row < 8 and 0 <= end_col < 8):
+                    break
+                table[sq][end_row * 8 + end_col] = mask
+                mask |= 1 << (end_row * 8 + end_col)
+    return table
+
+
+KNIGHT_ATTACKS = _build_leaper_table(((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)))
+KING_ATTACKS = _build_leaper_table(((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)))
+# PAWN_ATTACKS[color][sq] are the squares a pawn of that color on sq attacks
+PAWN_ATTACKS = (_build_leaper_table(((-1, -1), (-1, 1))), _build_leaper_table(((1, -1), (1, 1))))
+
+ROOK_DIRECTIONS = ((-1, 0), (0, -1), (1, 0), (0, 1))
+BISHOP_DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+# (ray table, True when the ray runs towards higher square indexes)
+ROOK_RAYS = [(_build_ray_table(d), d[0] * 8 + d[1] > 0) for d in ROOK_DIRECTIONS]
+BISHOP_RAYS = [(_build_ray_table(d), d[0] * 8 + d[1] > 0) for d in BISHOP_DIRECTIONS]
+BETWEEN = _build_between_table()
+
+
+def slider_attacks(sq: int, occupancy: int, rays: list) -> int:
+    attacks = 0
+    for ray_table, positive in rays:
+        ray = ray_table[sq]
+        blockers = ray & occupancy
+        if blockers:
+            if positive:
+                first = (blockers & -blockers).bit_length() - 1
+            else:
+                first = blockers.bit_length() - 1
+            ray ^= ray_table[first]
+        attacks |= ray
+    return attacks
+
+
+class BitboardGamestate(GamestateMixin):
+
+    def __init__(self, board=None):
+        if board is None:
+            board = START_BOARD
+        self.board = [list(row) for row in board]
+        self.bitboards = [0] * 12
+        self.occupancy = [0, 0]
+        for row in range(8):
+            for col in range(8):
+                piece = self.board[row][col]
+                if piece != "__":
+                    self.bitboards[PIECE_INDEX[piece]] |= 1 << (row * 8 + col)
+                    self.occupancy[WHITE if piece[0] == "w" else BLACK] |= 1 << (row * 8 + col)
+        self.allOccupancy = self.occupancy[WHITE] | self.occupancy[BLACK]
+        self.whiteToMove = True
+        self.moveLog = []
+        self.new_state_stack()
+        self.whiteKingLocation = divmod(self.bitboards[PIECE_INDEX["wK"]].bit_length() - 1, 8)
+        self.blackKingLocation = divmod(self.bitboards[PIECE_INDEX["bK"]].bit_length() - 1, 8)
+        self.checkmate = False
+        self.stalemate = False
+        self.inCheckAtt = False
+        self.castlingBits = ALL_CASTLING
+        self.enpassantPossible = ()
+        self.halfmoveClock = 0
+        self.fullmoveNumber = 1
+        self.zobristKey = compute_key(self.board, self.whiteToMove, self.currentCastlingRight, self.enpassantPossible)
+        self.boardScore = compute_score(self.board)
+
+    @classmethod
+    def from_fen(cls, fen: str):
+        board, white_to_move, castle_right, enpassant, halfmove_clock, fullmove_number = parse_fen(fen)
+        gamestate = cls(board)
+        gamestate.whiteToMove = white_to_move
+        gamestate.halfmoveClock = halfmove_clock
+        gamestate.fullmoveNumber = fullmove_number
+        gamestate.castlingBits = castle_bits(castle_right)
+        gamestate.enpassantPossible = ENPASSANT_SQUARES[ENPASSANT_CODES[enpassant]]
+        gamestate.zobristKey = compute_key(gamestate.board, white_to_move, castle_right, enpassant)
+        return gamestate
+
+    def _toggle(self, piece: str, sq: int) -> None:
+        bit = 1 << sq
+        self.bitboards[PIECE_INDEX[piece]] ^= bit
+        self.occupancy[WHITE if piece[0] == "w" else BLACK] ^= bit
+        self.zobristKey ^= PIECE_KEYS[piece][sq]
+
+    def make_move(self, move: int) -> None:
+        start_sq = move & 63
+        end_sq = (move >> 6) & 63
+        flag = move >> 12
+        start_row, start_col = divmod(start_sq, 8)
+        end_row, end_col = divmod(end_sq, 8)
+        board = self.board
+        piece_moved = board[start_row][start_col]
+        if flag == ENPASSANT:
+            piece_captured = board[start_row][end_col]
+        else:
+            piece_captured = board[end_row][end_col]
+        self.push_state(piece_captured)
+        self.zobristKey ^= CASTLING_KEYS[self.castlingBits] ^ \
+            enpassant_key(board, self.enpassantPossible, self.whiteToMove)
+        if flag == ENPASSANT:
+            self._toggle(piece_captured, start_row * 8 + end_col)
+            board[start_row][end_col] = "__"
+        elif piece_captured != "__":
+            self._toggle(piece_captured, end_sq)
+        if piece_moved[1] == "p" or piece_captured != "__":
+            self.halfmoveClock = 0
+        else:
+            self.halfmoveClock += 1
+        if piece_moved[0] == "b":
+            self.fullmoveNumber += 1
+        self._toggle(piece_moved, start_sq)
+        board[start_row][start_col] = "__"
+        if flag & PROMOTION:
+            promoted = piece_moved[0] + PROMOTION_PIECES[flag & 3]
+            self._toggle(promoted, end_sq)
+            board[end_row][end_col] = promoted
+        else:
+            self._toggle(piece_moved, end_sq)
+            board[end_row][end_col] = piece_moved
+
+        if flag == KING_CASTLE or flag == QUEEN_CASTLE:
+            rook = piece_moved[0] + "R"
+            if flag == KING_CASTLE:
+                rook_start, rook_end = end_col + 1, end_col - 1
+            else:
+                rook_start, rook_end = end_col - 2, end_col + 1
+            self._toggle(rook, end_row * 8 + rook_start)
+            self._toggle(rook, end_row * 8 + rook_end)
+            board[end_row][rook_start] = "__"
+            board[end_row][rook_end] = rook
+        self.allOccupancy = self.occupancy[WHITE] | self.occupancy[BLACK]
+
+        if piece_moved == "wK":
+            self.whiteKingLocation = (end_row, end_col)
+        elif piece_moved == "bK":
+            self.blackKingLocation = (end_row, end_col)
+
+        if flag == DOUBLE_PAWN_PUSH:
+            self.enpassantPossible = ENPASSANT_SQUARES[(start_row + end_row) // 2 * 8 + end_col + 1]
+        else:
+            self.enpassantPossible = ()
+        self.castlingBits &= CASTLE_MASK[start_sq] & CASTLE_MASK[end_sq]
+        self.moveLog.append(move)
+        self.whiteToMove = not self.whiteToMove
+        self.zobristKey ^= WHITE_TO_MOVE_KEY ^ CASTLING_KEYS[self.castlingBits] ^ \
+            enpassant_key(board, self.enpassantPossible, self.whiteToMove)
+        self.boardScore += move_score(move, piece_moved, piece_captured)
+
+    def undo_move(self) -> None:
+        if len(self.moveLog) != 0:
+            move = self.moveLog.pop()
+            board = self.board
+            piece_captured = self.pop_state()
+            self.whiteToMove = not self.whiteToMove
+            start_sq = move & 63
+            end_sq = (move >> 6) & 63
+            flag = move >> 12
+            start_row, start_col = divmod(start_sq, 8)
+            end_row, end_col = divmod(end_sq, 8)
+
+            piece_moved = board[end_row][end_col]
+            self._toggle(piece_moved, end_sq)
+            if flag & PROMOTION:
+                piece_moved = piece_moved[0] + "p"
+            if piece_moved[0] == "b":
+                self.fullmoveNumber -= 1
+            self._toggle(piece_moved, start_sq)
+            board[start_row][start_col] = piece_moved
+            board[end_row][end_col] = "__"
+            if flag == ENPASSANT:
+                self._toggle(piece_captured, start_row * 8 + end_col)
+                board[start_row][end_col] = piece_captured
+            elif piece_captured != "__":
+                self._toggle(piece_captured, end_sq)
+                board[end_row][end_col] = piece_captured
+
+            if flag == KING_CASTLE or flag == QUEEN_CASTLE:
+                rook = piece_moved[0] + "R"
+                if flag == KING_CASTLE:
+                    rook_start, rook_end = end_col + 1, end_col - 1
+                else:
+                    rook_start, rook_end = end_col - 2, end_col + 1
+                self._toggle(rook, end_row * 8 + rook_start)
+                self._toggle(rook, end_row * 8 + rook_end)
+                board[end_row][rook_start] = rook
+                board[end_row][rook_end] = "__"
+            self.allOccupancy = self.occupancy[WHITE] | self.occupancy[BLACK]
+
+            if piece_moved == "wK":
+                self.whiteKingLocation = (start_row, start_col)
+            elif piece_moved == "bK":
+                self.blackKingLocation = (start_row, start_col)
+            self.zobristKey = self.keyStack[self.ply]
+            self.boardScore -= move_score(move, piece_moved, piece_captured)
+            self.checkmate = False
+            self.stalemate = False
+
+    def has_non_pawn_material(self) -> bool:
+        offset = 0 if self.whiteToMove else 6
+        return (self.bitboards[offset + KNIGHT] | self.bitboards[offset + BISHOP] | self.bitboards[offset + ROOK] |
+                self.bitboards[offset + QUEEN]) != 0
+
+    def attackers_to(self, sq: int, color: int, occupancy: int) -> int:
+        offset = 6 * color
+        bitboards = self.bitboards
+        queens = bitboards[offset + QUEEN]
+        return (PAWN_ATTACKS[1 - color][sq] & bitboards[offset + PAWN]) | \
+            (KNIGHT_ATTACKS[sq] & bitboards[offset + KNIGHT]) | \
+            (KING_ATTACKS[sq] & bitboards[offset + KING]) | \
+            (slider_attacks(sq, occupancy, ROOK_RAYS) & (bitboards[offset + ROOK] | queens)) | \
+            (slider_attacks(sq, occupancy, BISHOP_RAYS) & (bitboards[offset + BISHOP] | queens))
+
+    def is_check(self) -> bool:
+        if self.whiteToMove:
+            king_row, king_col = self.whiteKingLocation
+        else:
+            king_row, king_col = self.blackKingLocation
+        return self.square_threatened(king_row, king_col)
+
+    def square_threatened(self, row: int, col: int) -> bool:
+        enemy = BLACK if self.whiteToMove else WHITE
+        return self.attackers_to(row * 8 + col, enemy, self.allOccupancy) != 0
+
+    def get_pins(self, king_sq: int, us: int, them: int) -> dict:
+        pins = {}
+        offset = 6 * them
+        queens = self.bitboards[offset + QUEEN]
+        enemies = self.occupancy[them]
+        snipers = (slider_attacks(king_sq, enemies, ROOK_RAYS) & (self.bitboards[offset + ROOK] | queens)) | \
+                  (slider_attacks(king_sq, enemies, BISHOP_RAYS) & (self.bitboards[offset + BISHOP] | queens))
+        while snipers:
+            sniper_bit = snipers & -snipers
+            snipers ^= sniper_bit
+            sniper_sq = sniper_bit.bit_length() - 1
+            between = BETWEEN[king_sq][sniper_sq]
+            blockers = between & self.allOccupancy
+            if blockers and blockers & (blockers - 1) == 0 and blockers & self.occupancy[us]:
+                pins[blockers.bit_length() - 1] = between | sniper_bit
+        return pins
+
+    def get_valid_moves_efficient(self, captures_only: bool = False) -> array:
+        # captures_only keeps captures and promotions unless in check, then every evasion is still generated
+        moves = array("H")
+        us = WHITE if self.whiteToMove else BLACK
+        them = 1 - us
+        offset = 6 * us
+        own = self.occupancy[us]
+        enemies = self.occupancy[them]
+        occupancy = self.allOccupancy
+        king_bit = self.bitboards[offset + KING]
+        king_sq = king_bit.bit_length() - 1
+        checkers = self.attackers_to(king_sq, them, occupancy)
+        self.inCheckAtt = checkers != 0
+        noisy = captures_only and not checkers
+
+        targets = KING_ATTACKS[king_sq] & (enemies if noisy else ~own)
+        without_king = occupancy ^ king_bit
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            end_sq = bit.bit_length() - 1
+            if not self.attackers_to(end_sq, them, without_king):
+                moves.append(encode_move(king_sq, end_sq, CAPTURE if bit & enemies else QUIET))
+
+        if checkers & (checkers - 1) == 0:
+            if checkers:
+                checker_sq = checkers.bit_length() - 1
+                check_mask = checkers | BETWEEN[king_sq][checker_sq]
+            else:
+                check_mask = FULL_BOARD
+                if not noisy:
+                    self.get_castle_moves(king_sq, us, moves)
+            pins = self.get_pins(king_sq, us, them)
+            self.get_pawn_moves(us, pins, check_mask, moves, noisy)
+
+            knights = self.bitboards[offset + KNIGHT]
+            while knights:
+                bit = knights & -knights
+                knights ^= bit
+                sq = bit.bit_length() - 1
+                if sq not in pins:
+                    targets = KNIGHT_ATTACKS[sq] & ~own & check_mask
+                    self.add_moves(sq, targets & enemies, CAPTURE, moves)
+                    if not noisy:
+                        self.add_moves(sq, targets & ~enemies, QUIET, moves)
+
+            queens = self.bitboards[offset + QUEEN]
+            for pieces, rays in ((self.bitboards[offset + BISHOP] | queens, BISHOP_RAYS),
+                                 (self.bitboards[offset + ROOK] | queens, ROOK_RAYS)):
+                while pieces:
+                    bit = pieces & -pieces
+                    pieces ^= bit
+                    sq = bit.bit_length() - 1
+                    targets = slider_attacks(sq, occupancy, rays) & ~own & check_mask
+                    if sq in pins:
+                        targets &= pins[sq]
+                    self.add_moves(sq, targets & enemies, CAPTURE, moves)
+                    if not noisy:
+                        self.add_moves(sq, targets & ~enemies, QUIET, moves)
+
+        if noisy:
+            return moves
+        if len(moves) == 0:
+            if self.inCheckAtt:
+                self.checkmate = True
+            else:
+                self.stalemate = True
+        else:
+            self.checkmate = False
+            self.stalemate = False
+        return moves
+
+    def get_valid_captures(self) -> array:
+        return self.get_valid_moves_efficient(captures_only=True)
+
+    @staticmethod
+    def add_moves(start_sq: int, targets: int, flag: int, moves: array) -> None:
+        code = start_sq | flag << 12
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            moves.append(code | (bit.bit_length() - 1) << 6)
+
+    @staticmethod
+    def add_pawn_moves(start_sq: int, targets: int, flag: int, moves: array) -> None:
+        BitboardGamestate.add_moves(start_sq, targets & ~PROMOTION_SQUARES, flag, moves)
+        targets &= PROMOTION_SQUARES
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            for promotion in range(3, -1, -1):
+                moves.append(encode_move(start_sq, bit.bit_length() - 1, flag | PROMOTION | promotion))
+
+    def get_pawn_moves(self, us: int, pins: dict, check_mask: int, moves: array, noisy: bool = False) -> None:
+        them = 1 - us
+        occupancy = self.allOccupancy
+        enemies = self.occupancy[them]
+        forward = -8 if us == WHITE else 8
+        double_row = 6 if us == WHITE else 1
+        pawns = self.bitboards[6 * us + PAWN]
+        ep_sq = -1
+        if self.enpassantPossible != ():
+            ep_sq = self.enpassantPossible[0] * 8 + self.enpassantPossible[1]
+        while pawns:
+            bit = pawns & -pawns
+            pawns ^= bit
+            sq = bit.bit_length() - 1
+            allowed = check_mask & pins.get(sq, FULL_BOARD)
+            push_sq = sq + forward
+            if not (occupancy >> push_sq) & 1:
+                self.add_pawn_moves(sq, (1 << push_sq) & allowed & (PROMOTION_SQUARES if noisy else FULL_BOARD),
+                                    QUIET, moves)
+                if sq >> 3 == double_row and not noisy:
+                    double_sq = push_sq + forward
+                    if not (occupancy >> double_sq) & 1 and (allowed >> double_sq) & 1:
+                        moves.append(encode_move(sq, double_sq, DOUBLE_PAWN_PUSH))
+            attacks = PAWN_ATTACKS[us][sq]
+            self.add_pawn_moves(sq, attacks & enemies & allowed, CAPTURE, moves)
+            if ep_sq >= 0 and (attacks >> ep_sq) & 1 and self.enpassant_is_legal(sq, ep_sq, us):
+                moves.append(encode_move(sq, ep_sq, ENPASSANT))
+
+    def enpassant_is_legal(self, start_sq: int, ep_sq: int, us: int) -> bool:
+        # the only move that removes two pieces from a line, so test it directly on the resulting occupancy
+        them = 1 - us
+        captured_bit = 1 << (ep_sq - 8 if us == BLACK else ep_sq + 8)
+        occupancy = self.allOccupancy ^ (1 << start_sq) ^ (1 << ep_sq) ^ captured_bit
+        king_sq = self.bitboards[6 * us + KING].bit_length() - 1
+        offset = 6 * them
+        queens = self.bitboards[offset + QUEEN]
+        if slider_attacks(king_sq, occupancy, ROOK_RAYS) & (self.bitboards[offset + ROOK] | queens):
+            return False
+        if slider_attacks(king_sq, occupancy, BISHOP_RAYS) & (self.bitboards[offset + BISHOP] | queens):
+            return False
+        if KNIGHT_ATTACKS[king_sq] & self.bitboards[offset + KNIGHT]:
+            return False
+        return not PAWN_ATTACKS[us][king_sq] & self.bitboards[offset + PAWN] & ~captured_bit
+
+    def get_castle_moves(self, king_sq: int, us: int, moves: array) -> None:
+        them = 1 - us
+        occupancy = self.allOccupancy
+        if us == WHITE:
+            king_side, queen_side = WHITE_KING_CASTLE, WHITE_QUEEN_CASTLE
+        else:
+            king_side, queen_side = BLACK_KING_CASTLE, BLACK_QUEEN_CASTLE
+        if self.castlingBits & king_side and not (occupancy >> (king_sq + 1)) & 3:
+            if not self.attackers_to(king_sq + 1, them, occupancy) and \
+                    not self.attackers_to(king_sq + 2, them, occupancy):
+                moves.append(encode_move(king_sq, king_sq + 2, KING_CASTLE))
+        if self.castlingBits & queen_side and not (occupancy >> (king_sq - 3)) & 7:
+            if not self.attackers_to(king_sq - 1, them, occupancy) and \
+                    not self.attackers_to(king_sq - 2, them, occupancy):
+                moves.append(encode_move(king_sq, king_sq - 2, QUEEN_CASTLE))
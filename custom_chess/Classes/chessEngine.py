@@ -1,116 +1,208 @@
 import typing
-import copy
+from array import array
 import numpy as np
 from multiprocessing import process, Queue
 from numpy.typing import NDArray
-from custom_chess.Classes.MoveClass import Move
-from custom_chess.Classes.CastleRights import CastleRights
-
-
-class Gamestate:
-
-    def __init__(self):
-        self.board = np.array(
-            [["bR", "bN", "bB", "bQ", "bK", "bB", "bN", "bR"],
-             ["bp", "bp", "bp", "bp", "bp", "bp", "bp", "bp"],
-             ["__", "__", "__", "__", "__", "__", "__", "__"],
-             ["__", "__", "__", "__", "__", "__", "__", "__"],
-             ["__", "__", "__", "__", "__", "__", "__", "__"],
-             ["__", "__", "__", "__", "__", "__", "__", "__"],
-             ["wp", "wp", "wp", "wp", "wp", "wp", "wp", "wp"],
-             ["wR", "wN", "wB", "wQ", "wK", "wB", "wN", "wR"]])
+from custom_chess.Classes.MoveClass import encode_move, QUIET, DOUBLE_PAWN_PUSH, KING_CASTLE, QUEEN_CASTLE, CAPTURE, ENPASSANT, \
+    PROMOTION, PROMOTION_PIECES
+from custom_chess.Classes.chessNotation import START_FEN, parse_fen
+from custom_chess.Classes.zobristKeys import PIECE_KEYS, WHITE_TO_MOVE_KEY, CASTLING_KEYS, enpassant_key, compute_key
+from custom_chess.Classes.pieceSquareTables import compute_score, move_score
+from custom_chess.Classes.stateStack import WHITE_KING_CASTLE, WHITE_QUEEN_CASTLE, BLACK_KING_CASTLE, \
+    BLACK_QUEEN_CASTLE, CASTLE_MASK, ENPASSANT_SQUARES, ENPASSANT_CODES, castle_bits
+from custom_chess.Classes.gamestateMixin import GamestateMixin
+
+ALL_SQUARES = (1 << 64) - 1
+# rook directions first, then bishop directions
+DIRECTIONS = ((-1, 0), (0, -1), (1, 0), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1))
+KNIGHT_JUMPS = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
+
+
+def step_masks(steps: tuple) -> list:
+    masks = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        mask = 0
+        for d_row, d_col in steps:
+            if 0 <= row + d_row < 8 and 0 <= col + d_col < 8:
+                mask |= 1 << ((row + d_row) * 8 + col + d_col)
+        masks.append(mask)
+    return masks
+
+
+KNIGHT_ATTACKS = step_masks(KNIGHT_JUMPS)
+KING_ATTACKS = step_masks(DIRECTIONS)
+PAWN_ATTACKS = {"w": step_masks(((-1, -1), (-1, 1))), "b": step_masks(((1, -1), (1, 1)))}
+SLIDER_DIRECTIONS = {"R": DIRECTIONS[:4], "B": DIRECTIONS[4:], "Q": DIRECTIONS}
+
+
+class Gamestate(GamestateMixin):
+
+    def __init__(self, fen: str = START_FEN):
+        board, self.whiteToMove, castle_right, enpassant, self.halfmoveClock, self.fullmoveNumber = parse_fen(fen)
+        self.castlingBits = castle_bits(castle_right)
+        self.enpassantPossible = ENPASSANT_SQUARES[ENPASSANT_CODES[enpassant]]
+        self.board = np.array(board)
         self.moveFunctions = {"p": self.get_pawn_moves, "R": self.get_rook_moves, "N": self.get_knight_moves,
                               "B": self.get_bishop_moves, "Q": self.get_queen_moves, "K": self.get_king_moves}
-        self.whiteToMove = True
         self.moveLog = []
+        self.new_state_stack()
         self.blackKingLocation = (0, 4)
         self.whiteKingLocation = (7, 4)
+        for row in range(8):
+            for col in range(8):
+                if board[row][col] == "wK":
+                    self.whiteKingLocation = (row, col)
+                elif board[row][col] == "bK":
+                    self.blackKingLocation = (row, col)
         self.checkmate = False
         self.stalemate = False
         self.inCheckAtt = False
-        self.pins = []
-        self.checks = []
-        self.currentCastlingRight = CastleRights(True, True, True, True)
-        self.enpassantPossible = ()
-        self.enpassant_possible_log = [self.enpassantPossible]
-        self.castleRightsLog = [
-            CastleRights(self.currentCastlingRight.white_king_castle, self.currentCastlingRight.black_king_castle,
-                         self.currentCastlingRight.white_queen_castle, self.currentCastlingRight.black_queen_castle)]
-
-    def make_move(self, move: Move) -> None:
-        self.board[move.startRow][move.startCol] = "__"
-        self.board[move.endRow][move.endCol] = move.pieceMoved
+        # per node: squares each pinned piece may move to, squares that answer a check and enemy attacks
+        self.pinMasks = {}
+        self.checkMask = ALL_SQUARES
+        self.attackedSquares = 0
+        # the plain board lists are much quicker to walk than the numpy array
+        self.zobristKey = compute_key(board, self.whiteToMove, castle_right, self.enpassantPossible)
+        # material and piece-square score from white's side in centipawns
+        self.boardScore = compute_score(board)
+
+    @classmethod
+    def from_fen(cls, fen: str):
+        return cls(fen)
+
+    def make_move(self, move: int) -> None:
+        start_row, start_col = divmod(move & 63, 8)
+        end_row, end_col = divmod((move >> 6) & 63, 8)
+        flag = move >> 12
+        piece_moved = self.board[start_row][start_col]
+        if flag == ENPASSANT:
+            piece_captured = self.board[start_row][end_col]
+        else:
+            piece_captured = self.board[end_row][end_col]
+        self.push_state(piece_captured)
+        self.zobristKey ^= CASTLING_KEYS[self.castlingBits] ^ \
+            enpassant_key(self.board, self.enpassantPossible, self.whiteToMove)
+        self.board[start_row][start_col] = "__"
+        self.board[end_row][end_col] = piece_moved
         self.moveLog.append(move)
-        if move.pieceMoved == "wK":
-            self.whiteKingLocation = (move.endRow, move.endCol)
-        elif move.pieceMoved == "bK":
-            self.blackKingLocation = (move.endRow, move.endCol)
+        if piece_moved[1] == "p" or piece_captured != "__":
+            self.halfmoveClock = 0
+        else:
+            self.halfmoveClock += 1
+        if piece_moved[0] == "b":
+            self.fullmoveNumber += 1
+        if piece_moved == "wK":
+            self.whiteKingLocation = (end_row, end_col)
+        elif piece_moved == "bK":
+            self.blackKingLocation = (end_row, end_col)
         self.whiteToMove = not self.whiteToMove
 
-        if move.isPawnPromotion:
-            # promotePiece = input("Promueve a Q, R, B o N")
-            self.board[move.endRow][move.endCol] = move.pieceMoved[0] + "Q"
+        if flag & PROMOTION:
+            self.board[end_row][end_col] = piece_moved[0] + PROMOTION_PIECES[flag & 3]
 
-        if move.isenpassantMove:
-            self.board[move.startRow][move.endCol] = "__"
+        if flag == ENPASSANT:
+            self.board[start_row][end_col] = "__"
 
-        if move.pieceMoved[1] == "p" and abs(move.startRow - move.endRow) == 2:
-            self.enpassantPossible = ((move.startRow + move.endRow) // 2, move.endCol)
+        if flag == DOUBLE_PAWN_PUSH:
+            self.enpassantPossible = ENPASSANT_SQUARES[(start_row + end_row) // 2 * 8 + end_col + 1]
         else:
             self.enpassantPossible = ()
 
-        if move.isCastleMove:
-            if move.endCol - move.startCol == 2:
-                self.board[move.endRow][move.endCol - 1] = self.board[move.endRow][move.endCol + 1]
-                self.board[move.endRow][move.endCol + 1] = "__"
-            else:
-                self.board[move.endRow][move.endCol + 1] = self.board[move.endRow][move.endCol - 2]
-                self.board[move.endRow][move.endCol - 2] = "__"
+        if flag == KING_CASTLE:
+            self.board[end_row][end_col - 1] = self.board[end_row][end_col + 1]
+            self.board[end_row][end_col + 1] = "__"
+        elif flag == QUEEN_CASTLE:
+            self.board[end_row][end_col + 1] = self.board[end_row][end_col - 2]
+            self.board[end_row][end_col - 2] = "__"
 
-        self.enpassant_possible_log.append(self.enpassantPossible)
-        self.update_castle_rights(move)
-        self.castleRightsLog.append(
-            CastleRights(self.currentCastlingRight.white_king_castle, self.currentCastlingRight.black_king_castle,
-                         self.currentCastlingRight.white_queen_castle, self.currentCastlingRight.black_queen_castle))
+        self.castlingBits &= CASTLE_MASK[move & 63] & CASTLE_MASK[(move >> 6) & 63]
+        self.zobristKey ^= self.move_key(move, piece_moved, piece_captured) ^ WHITE_TO_MOVE_KEY ^ \
+            CASTLING_KEYS[self.castlingBits] ^ enpassant_key(self.board, self.enpassantPossible, self.whiteToMove)
+        self.boardScore += move_score(move, piece_moved, piece_captured)
 
     def undo_move(self) -> None:
         if len(self.moveLog) != 0:
-            move: Move = self.moveLog.pop()
-            self.board[move.startRow][move.startCol] = move.pieceMoved
-            self.board[move.endRow][move.endCol] = move.pieceCaptured
+            move = self.moveLog.pop()
+            piece_captured = self.pop_state()
+            start_row, start_col = divmod(move & 63, 8)
+            end_row, end_col = divmod((move >> 6) & 63, 8)
+            flag = move >> 12
+            piece_moved = self.board[end_row][end_col]
+            if flag & PROMOTION:
+                piece_moved = piece_moved[0] + "p"
+            self.board[start_row][start_col] = piece_moved
+            self.board[end_row][end_col] = piece_captured
             self.whiteToMove = not self.whiteToMove
-
-            if move.pieceMoved == "wK":
-                self.whiteKingLocation = (move.startRow, move.startCol)
-            elif move.pieceMoved == "bK":
-                self.blackKingLocation = (move.startRow, move.startCol)
-
-            if move.isenpassantMove:
-                self.board[move.endRow][move.endCol] = "__"
-                self.board[move.startRow][move.endCol] = move.pieceCaptured
-
-            self.enpassant_possible_log.pop()
-            self.enpassantPossible = self.enpassant_possible_log[-1]
-
-            self.castleRightsLog.pop()
-            self.currentCastlingRight = copy.deepcopy(self.castleRightsLog[-1])
-            if move.isCastleMove:
-                if move.endCol - move.startCol == 2:
-                    self.board[move.endRow][move.endCol + 1] = self.board[move.endRow][move.endCol - 1]
-                    self.board[move.endRow][move.endCol - 1] = "__"
-                else:
-                    self.board[move.endRow][move.endCol - 2] = self.board[move.endRow][move.endCol + 1]
-                    self.board[move.endRow][move.endCol + 1] = "__"
+            if piece_moved[0] == "b":
+                self.fullmoveNumber -= 1
+
+            if piece_moved == "wK":
+                self.whiteKingLocation = (start_row, start_col)
+            elif piece_moved == "bK":
+                self.blackKingLocation = (start_row, start_col)
+
+            if flag == ENPASSANT:
+                self.board[end_row][end_col] = "__"
+                self.board[start_row][end_col] = piece_captured
+
+            if flag == KING_CASTLE:
+                self.board[end_row][end_col + 1] = self.board[end_row][end_col - 1]
+                self.board[end_row][end_col - 1] = "__"
+            elif flag == QUEEN_CASTLE:
+                self.board[end_row][end_col - 2] = self.board[end_row][end_col + 1]
+                self.board[end_row][end_col + 1] = "__"
+            self.boardScore -= move_score(move, piece_moved, piece_captured)
             self.checkmate = False
             self.stalemate = False
 
-    def get_valid_moves_naive(self) -> list[Move]:
+    def has_non_pawn_material(self) -> bool:
+        ally = "w" if self.whiteToMove else "b"
+        for row in self.board:
+            for piece in row:
+                if piece[0] == ally and piece[1] in "NBRQ":
+                    return True
+        return False
+
+    def move_key(self, move: int, piece_moved: str, piece_captured: str) -> int:
+        # XOR of the piece-square keys a move touches, its own inverse so make and undo share it
+        start_sq = move & 63
+        end_sq = (move >> 6) & 63
+        flag = move >> 12
+        key = PIECE_KEYS[piece_moved][start_sq]
+        if flag & PROMOTION:
+            key ^= PIECE_KEYS[piece_moved[0] + PROMOTION_PIECES[flag & 3]][end_sq]
+        else:
+            key ^= PIECE_KEYS[piece_moved][end_sq]
+        if piece_captured != "__":
+            if flag == ENPASSANT:
+                key ^= PIECE_KEYS[piece_captured][(start_sq & ~7) | (end_sq & 7)]
+            else:
+                key ^= PIECE_KEYS[piece_captured][end_sq]
+        if flag == KING_CASTLE:
+            rook = PIECE_KEYS[piece_moved[0] + "R"]
+            key ^= rook[end_sq + 1] ^ rook[end_sq - 1]
+        elif flag == QUEEN_CASTLE:
+            rook = PIECE_KEYS[piece_moved[0] + "R"]
+            key ^= rook[end_sq - 2] ^ rook[end_sq + 1]
+        return key
+
+    def get_valid_moves_naive(self) -> array:
+        # pseudo-legal moves filtered by playing them out, the reference the efficient generator is tested against
+        self.pinMasks = {}
+        self.checkMask = ALL_SQUARES
+        self.attackedSquares = 0
         moves = self.get_all_possible_moves()
+        self.attackedSquares = self.enemy_attacks()
+        if self.whiteToMove:
+            self.get_castle_moves(self.whiteKingLocation[0], self.whiteKingLocation[1], moves)
+        else:
+            self.get_castle_moves(self.blackKingLocation[0], self.blackKingLocation[1], moves)
         for i in range(len(moves) - 1, -1, -1):
             self.make_move(moves[i])
             self.whiteToMove = not self.whiteToMove
             if self.is_check():
-                moves.remove(moves[i])
+                del moves[i]
             self.whiteToMove = not self.whiteToMove
             self.undo_move()
 
@@ -126,51 +218,26 @@ class Gamestate:
                 self.stalemate = False
         return moves
 
-    def get_valid_moves_efficient(self) -> list[Move]:
-        moves: list[Move] = []
-        temp_castle_right = CastleRights(self.currentCastlingRight.white_king_castle,
-                                       self.currentCastlingRight.black_king_castle,
-                                       self.currentCastlingRight.white_queen_castle,
-                                       self.currentCastlingRight.black_queen_castle)
-        self.inCheckAtt, self.pins, self.checks = self.check_pins_and_checks()
+    def get_valid_moves_efficient(self) -> array:
+        moves = array("H")
+        self.update_legality_masks()
+        self.attackedSquares = self.enemy_attacks()
         if self.whiteToMove:
             king_row = self.whiteKingLocation[0]
             king_col = self.whiteKingLocation[1]
         else:
             king_row = self.blackKingLocation[0]
             king_col = self.blackKingLocation[1]
-        if self.inCheckAtt:
-            if len(self.checks) == 1:
-                moves = self.get_all_possible_moves()
-                check = self.checks[0]
-                check_row = check[0]
-                check_col = check[1]
-                piece_checking = self.board[check_row][check_col]
-                print("check ", piece_checking)
-                valid_squares = []
-                if piece_checking[1] == "K":
-                    valid_squares = [(check_row, check_col)]
-                else:
-                    for i in range(1, 8):
-                        valid_square = (king_row + check[2] * i, king_col + check[3] * i)
-                        valid_squares.append(valid_square)
-                        if valid_square[0] == check_row and valid_square[1] == check_col:
-                            break
-                for i in range(len(moves) - 1, -1, -1):
-                    if moves[i].pieceMoved[1] != "K":
-                        if not (moves[i].endRow, moves[i].endCol) in valid_squares:
-                            moves.remove(moves[i])
-            else:
-                self.get_king_moves(king_row, king_col, moves)
+        if self.checkMask == 0:
+            # double check, only the king can move
+            self.get_king_moves(king_row, king_col, moves)
         else:
             moves = self.get_all_possible_moves()
-            if self.whiteToMove:
-                self.get_castle_moves(self.whiteKingLocation[0], self.whiteKingLocation[1], moves)
-            else:
-                self.get_castle_moves(self.blackKingLocation[0], self.blackKingLocation[1], moves)
+            if not self.inCheckAtt:
+                self.get_castle_moves(king_row, king_col, moves)
 
         if len(moves) == 0:
-            if self.is_check():
+            if self.inCheckAtt:
                 self.checkmate = True
             else:
                 self.stalemate = True
@@ -178,66 +245,161 @@ class Gamestate:
             self.checkmate = False
             self.stalemate = False
 
-        self.current_castling_rights = temp_castle_right
+        return moves
 
+    def get_valid_captures(self) -> array:
+        # captures, en passant and promotions for the quiescence search, every evasion when in check
+        self.update_legality_masks()
+        if self.inCheckAtt:
+            return self.get_valid_moves_efficient()
+        moves = array("H")
+        pin_masks = self.pinMasks
+        if self.whiteToMove:
+            ally, enemy_color, forward = "w", "b", -1
+        else:
+            ally, enemy_color, forward = "b", "w", 1
+        board = self.board
+        attacked = None
+        for row in range(8):
+            for col in range(8):
+                piece = board[row][col]
+                if piece[0] != ally:
+                    continue
+                allowed = pin_masks.get(row * 8 + col, ALL_SQUARES)
+                kind = piece[1]
+                if kind == "p":
+                    end_row = row + forward
+                    if (end_row == 0 or end_row == 7) and board[end_row][col] == "__" and \
+                            allowed >> (end_row * 8 + col) & 1:
+                        self.add_pawn_move(row, col, end_row, col, moves)
+                    for d_col in (-1, 1):
+                        end_col = col + d_col
+                        if 0 <= end_col <= 7:
+                            if board[end_row][end_col][0] == enemy_color and allowed >> (end_row * 8 + end_col) & 1:
+                                self.add_pawn_move(row, col, end_row, end_col, moves)
+                            if (end_row, end_col) == self.enpassantPossible:
+                                self.add_enpassant_move(row, col, end_row, end_col, moves)
+                elif kind == "N":
+                    if allowed == ALL_SQUARES:
+                        for d_row, d_col in KNIGHT_JUMPS:
+                            end_row = row + d_row
+                            end_col = col + d_col
+                            if 0 <= end_row < 8 and 0 <= end_col < 8 and board[end_row][end_col][0] == enemy_color:
+                                moves.append(encode_move(row * 8 + col, end_row * 8 + end_col, CAPTURE))
+                elif kind == "K":
+                    for d_row, d_col in DIRECTIONS:
+                        end_row = row + d_row
+                        end_col = col + d_col
+                        if 0 <= end_row < 8 and 0 <= end_col < 8 and board[end_row][end_col][0] == enemy_color:
+                            if attacked is None:
+                                attacked = self.enemy_attacks()
+                            if not attacked >> (end_row * 8 + end_col) & 1:
+                                moves.append(encode_move(row * 8 + col, end_row * 8 + end_col, CAPTURE))
+                else:
+                    for d_row, d_col in SLIDER_DIRECTIONS[kind]:
+                        for k in range(1, 8):
+                            end_row = row + d_row * k
+                            end_col = col + d_col * k
+                            if not (0 <= end_row < 8 and 0 <= end_col < 8):
+                                break
+                            end_piece = board[end_row][end_col]
+                            if end_piece != "__":
+                                if end_piece[0] == enemy_color and allowed >> (end_row * 8 + end_col) & 1:
+                                    moves.append(encode_move(row * 8 + col, end_row * 8 + end_col, CAPTURE))
+                                break
         return moves
 
-    def check_pins_and_checks(self):
-        pins = []
-        checks = []
-        in_check = False
+    def update_legality_masks(self) -> None:
+        # one walk along the eight lines and the knight jumps around the king. A friendly piece with an enemy
+        # slider behind it may only move along that line (its pin mask, pinner included); the check mask holds
+        # the squares that capture or block the checker, everything when not in check and nothing in double check.
+        pin_masks = {}
+        check_mask = ALL_SQUARES
+        checks = 0
         if self.whiteToMove:
             enemy_color = "b"
             ally_color = "w"
-            start_row = self.whiteKingLocation[0]
-            start_col = self.whiteKingLocation[1]
+            start_row, start_col = self.whiteKingLocation
         else:
             enemy_color = "w"
             ally_color = "b"
-            start_row = self.blackKingLocation[0]
-            start_col = self.blackKingLocation[1]
-        directions = ((-1, 0), (0, -1), (1, 0), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1))
-        for i in range(len(directions)):
-            direction = directions[i]
-            possible_pin = ()
+            start_row, start_col = self.blackKingLocation
+        board = self.board
+        for i in range(8):
+            d_row, d_col = DIRECTIONS[i]
+            ray = 0
+            possible_pin = -1
             for j in range(1, 8):
-                end_row = start_row + direction[0] * j
-                end_col = start_col + direction[1] * j
-                if 0 <= end_row < 8 and 0 <= end_col < 8:
-                    end_piece = self.board[end_row][end_col]
-                    if end_piece[0] == ally_color and end_piece[1] != "K":
-                        if possible_pin == ():
-                            possible_pin = (end_row, end_col, direction[0], direction[1])
-                        else:
-                            break
-                    elif end_piece[0] == enemy_color:
-                        type_piece = end_piece[1]
-                        if (0 <= i <= 3 and type_piece == "R") or \
-                                (4 <= i <= 7 and type_piece == "B") or \
-                                (j == 1 and type_piece == "p" and ((enemy_color == "w" and 6 <= i <= 7) or (
-                                        enemy_color == "b" and 3 == i or i == 5))) or \
-                                (type_piece == "Q") or (j == 1 and type_piece == "K"):
-                            if possible_pin == ():
-                                in_check = True
-                                checks.append((end_row, end_col, direction[0], direction[1]))
-                                break
-                            else:
-                                pins.append(possible_pin)
-                                break
+                end_row = start_row + d_row * j
+                end_col = start_col + d_col * j
+                if not (0 <= end_row < 8 and 0 <= end_col < 8):
+                    break
+                sq = end_row * 8 + end_col
+                ray |= 1 << sq
+                end_piece = board[end_row][end_col]
+                if end_piece[0] == ally_color:
+                    if possible_pin != -1:
+                        break
+                    possible_pin = sq
+                elif end_piece[0] == enemy_color:
+                    type_piece = end_piece[1]
+                    if (i <= 3 and type_piece == "R") or (i >= 4 and type_piece == "B") or type_piece == "Q" or \
+                            (j == 1 and type_piece == "p" and ((enemy_color == "w" and i >= 6) or
+                                                               (enemy_color == "b" and 4 <= i <= 5))) or \
+                            (j == 1 and type_piece == "K"):
+                        if possible_pin == -1:
+                            check_mask = ray if checks == 0 else 0
+                            checks += 1
                         else:
-                            break
-                else:
+                            pin_masks[possible_pin] = ray
                     break
-        knight_moves = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
-        for move in knight_moves:
-            end_row = start_row + move[0]
-            end_col = start_col + move[1]
-            if 0 <= end_row < 8 and 0 <= end_col < 8:
-                end_piece = self.board[end_row][end_col]
-                if end_piece[0] == enemy_color and end_piece[1] == "N":
-                    in_check = True
-                    checks.append((end_row, end_col, move[0], move[1]))
-        return in_check, pins, checks
+        for d_row, d_col in KNIGHT_JUMPS:
+            end_row = start_row + d_row
+            end_col = start_col + d_col
+            if 0 <= end_row < 8 and 0 <= end_col < 8 and board[end_row][end_col] == enemy_color + "N":
+                check_mask = 1 << (end_row * 8 + end_col) if checks == 0 else 0
+                checks += 1
+        self.inCheckAtt = checks > 0
+        self.pinMasks = pin_masks
+        self.checkMask = check_mask
+
+    def enemy_attacks(self) -> int:
+        # every square the side not to move attacks, with the moving king lifted off the board so that it cannot
+        # step back along the line of a slider checking it
+        if self.whiteToMove:
+            enemy_color = "b"
+            king_row, king_col = self.whiteKingLocation
+        else:
+            enemy_color = "w"
+            king_row, king_col = self.blackKingLocation
+        board = self.board.tolist()
+        board[king_row][king_col] = "__"
+        pawn_attacks = PAWN_ATTACKS[enemy_color]
+        attacks = 0
+        for row in range(8):
+            line = board[row]
+            for col in range(8):
+                piece = line[col]
+                if piece[0] != enemy_color:
+                    continue
+                kind = piece[1]
+                if kind == "p":
+                    attacks |= pawn_attacks[row * 8 + col]
+                elif kind == "N":
+                    attacks |= KNIGHT_ATTACKS[row * 8 + col]
+                elif kind == "K":
+                    attacks |= KING_ATTACKS[row * 8 + col]
+                else:
+                    for d_row, d_col in SLIDER_DIRECTIONS[kind]:
+                        end_row = row + d_row
+                        end_col = col + d_col
+                        while 0 <= end_row < 8 and 0 <= end_col < 8:
+                            attacks |= 1 << (end_row * 8 + end_col)
+                            if board[end_row][end_col] != "__":
+                                break
+                            end_row += d_row
+                            end_col += d_col
+        return attacks
 
     def is_check(self):
         if self.whiteToMove:
@@ -245,17 +407,43 @@ class Gamestate:
         else:
             return self.square_threatened(self.blackKingLocation[0], self.blackKingLocation[1])
 
-    def square_threatened(self, row: int, col: int):
-        self.whiteToMove = not self.whiteToMove
-        opponent_moves = self.get_all_possible_moves()
-        self.whiteToMove = not self.whiteToMove
-        for move in opponent_moves:
-            if move.endRow == row and move.endCol == col:
+    def square_threatened(self, row: int, col: int) -> bool:
+        # look outward from the square for an enemy piece that attacks it, instead of generating enemy moves
+        if self.whiteToMove:
+            enemy_color = "b"
+            pawn_row = row - 1
+        else:
+            enemy_color = "w"
+            pawn_row = row + 1
+        board = self.board
+        if 0 <= pawn_row < 8:
+            if (col - 1 >= 0 and board[pawn_row][col - 1] == enemy_color + "p") or \
+                    (col + 1 <= 7 and board[pawn_row][col + 1] == enemy_color + "p"):
                 return True
+        knight_moves = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
+        for move in knight_moves:
+            end_row = row + move[0]
+            end_col = col + move[1]
+            if 0 <= end_row < 8 and 0 <= end_col < 8 and board[end_row][end_col] == enemy_color + "N":
+                return True
+        directions = ((-1, 0), (0, -1), (1, 0), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1))
+        for i in range(len(directions)):
+            direction = directions[i]
+            sliders = "RQ" if i < 4 else "BQ"
+            for j in range(1, 8):
+                end_row = row + direction[0] * j
+                end_col = col + direction[1] * j
+                if not (0 <= end_row < 8 and 0 <= end_col < 8):
+                    break
+                end_piece = board[end_row][end_col]
+                if end_piece != "__":
+                    if end_piece[0] == enemy_color and (end_piece[1] in sliders or (j == 1 and end_piece[1] == "K")):
+                        return True
+                    break
         return False
 
-    def get_all_possible_moves(self):
-        moves = []
+    def get_all_possible_moves(self) -> array:
+        moves = array("H")
         for i in range(len(self.board)):
             for j in range(len(self.board[i])):
                 turn = self.board[i][j][0]
@@ -264,216 +452,132 @@ class Gamestate:
                     self.moveFunctions[piece](i, j, moves)
         return moves
 
-    def get_pawn_moves(self, row: int, col: int, moves: list[Move]):
-        piece_pinned = False
-        pin_direction = ()
-        for i in range(len(self.pins) - 1, -1, -1):
-            if self.pins[i][0] == row and self.pins[i][1] == col:
-                piece_pinned = True
-                pin_direction = (self.pins[i][2], self.pins[i][3])
-                self.pins.remove(self.pins[i])
-                break
+    def get_pawn_moves(self, row: int, col: int, moves: array):
+        allowed = self.pinMasks.get(row * 8 + col, ALL_SQUARES) & self.checkMask
         if self.whiteToMove:
-            if self.board[row - 1][col] == "__":
-                if not piece_pinned or pin_direction == (-1, 0):
-                    moves.append(Move((row, col), (row - 1, col), self.board))
-                    if row == 6 and self.board[row - 2][col] == "__":
-                        moves.append(Move((row, col), (row - 2, col), self.board))
-            if col - 1 >= 0:
-                if self.board[row - 1][col - 1][0] == "b":
-                    if not piece_pinned or pin_direction == (-1, 0):
-                        moves.append(Move((row, col), (row - 1, col - 1), self.board))
-                if (row - 1, col - 1) == self.enpassantPossible:
-                    if not piece_pinned or pin_direction == (-1, 0):
-                        moves.append(Move((row, col), (row - 1, col - 1), self.board, enpassant_move=True))
-            if col + 1 <= 7:
-                if self.board[row - 1][col + 1][0] == "b":
-                    if not piece_pinned or pin_direction == (-1, 0):
-                        moves.append(Move((row, col), (row - 1, col + 1), self.board))
-                if (row - 1, col + 1) == self.enpassantPossible:
-                    if not piece_pinned or pin_direction == (-1, 0):
-                        moves.append(Move((row, col), (row - 1, col + 1), self.board, enpassant_move=True))
+            forward, start_row, enemy_color = -1, 6, "b"
         else:
-            if self.board[row + 1][col] == "__":
-                if not piece_pinned or pin_direction == (1, 0):
-                    moves.append(Move((row, col), (row + 1, col), self.board))
-                    if row == 1 and self.board[row + 2][col] == "__":
-                        moves.append(Move((row, col), (row + 2, col), self.board))
-            if col - 1 >= 0:
-                if self.board[row + 1][col - 1][0] == "w":
-                    if not piece_pinned or pin_direction == (1, 0):
-                        moves.append(Move((row, col), (row + 1, col - 1), self.board))
-                if (row + 1, col - 1) == self.enpassantPossible:
-                    if not piece_pinned or pin_direction == (-1, 0):
-                        moves.append(Move((row, col), (row + 1, col - 1), self.board, enpassant_move=True))
-            if col + 1 <= 7:
-                if self.board[row + 1][col + 1][0] == "w":
-                    if not piece_pinned or pin_direction == (1, 0):
-                        moves.append(Move((row, col), (row + 1, col + 1), self.board))
-                if (row + 1, col + 1) == self.enpassantPossible:
-                    if not piece_pinned or pin_direction == (-1, 0):
-                        moves.append(Move((row, col), (row + 1, col + 1), self.board, enpassant_move=True))
-
-    def get_rook_moves(self, row: int, col: int, moves: list[Move]) -> None:
-        piece_pinned = False
-        pin_direction = ()
-        for i in range(len(self.pins) - 1, -1, -1):
-            if self.pins[i][0] == row and self.pins[i][1] == col:
-                piece_pinned = True
-                pin_direction = (self.pins[i][2], self.pins[i][3])
-                if self.board[row][col][1] != "Q":
-                    self.pins.remove(self.pins[i])
-                break
-        directions = ((-1, 0), (0, -1), (1, 0), (0, 1))
-        if self.whiteToMove:
-            enemy_color = "b"
+            forward, start_row, enemy_color = 1, 1, "w"
+        end_row = row + forward
+        if self.board[end_row][col] == "__":
+            if allowed >> (end_row * 8 + col) & 1:
+                self.add_pawn_move(row, col, end_row, col, moves)
+            if row == start_row and self.board[row + 2 * forward][col] == "__" and \
+                    allowed >> ((row + 2 * forward) * 8 + col) & 1:
+                moves.append(encode_move(row * 8 + col, (row + 2 * forward) * 8 + col, DOUBLE_PAWN_PUSH))
+        for d_col in (-1, 1):
+            end_col = col + d_col
+            if 0 <= end_col <= 7:
+                if self.board[end_row][end_col][0] == enemy_color and allowed >> (end_row * 8 + end_col) & 1:
+                    self.add_pawn_move(row, col, end_row, end_col, moves)
+                if (end_row, end_col) == self.enpassantPossible:
+                    self.add_enpassant_move(row, col, end_row, end_col, moves)
+
+    def add_pawn_move(self, row: int, col: int, end_row: int, end_col: int, moves: array) -> None:
+        flag = QUIET if self.board[end_row][end_col] == "__" else CAPTURE
+        if end_row == 0 or end_row == 7:
+            for promotion in range(3, -1, -1):
+                moves.append(encode_move(row * 8 + col, end_row * 8 + end_col, flag | PROMOTION | promotion))
         else:
-            enemy_color = "w"
-        for direction in directions:
-            for k in range(1, 8):
-                end_row = row + direction[0] * k
-                end_col = col + direction[1] * k
-                if 0 <= end_row < 8 and 0 <= end_col < 8:
-                    if not piece_pinned or pin_direction == direction or pin_direction == (-direction[0], -direction[1]):
-                        end_piece = self.board[end_row][end_col]
-                        if end_piece == "__":
-                            moves.append(Move((row, col), (end_row, end_col), self.board))
-                        elif end_piece[0] == enemy_color:
-                            moves.append(Move((row, col), (end_row, end_col), self.board))
-                            break
-                        else:
-                            break
-                    else:
-                        break
+            moves.append(encode_move(row * 8 + col, end_row * 8 + end_col, flag))
+
+    def add_enpassant_move(self, row: int, col: int, end_row: int, end_col: int, moves: array) -> None:
+        # taking en passant empties two squares of a line, which the masks cannot see, so try the move out
+        move = encode_move(row * 8 + col, end_row * 8 + end_col, ENPASSANT)
+        self.make_move(move)
+        self.whiteToMove = not self.whiteToMove
+        if not self.is_check():
+            moves.append(move)
+        self.whiteToMove = not self.whiteToMove
+        self.undo_move()
 
-    def get_knight_moves(self, row: int, col: int, moves: list[Move]) -> None:
-        piece_pinned = False
-        for i in range(len(self.pins) - 1, -1, -1):
-            if self.pins[i][0] == row and self.pins[i][1] == col:
-                piece_pinned = True
-                self.pins.remove(self.pins[i])
-                break
-        possibly_moves = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
+    def get_slider_moves(self, row: int, col: int, moves: array, directions: tuple) -> None:
+        sq = row * 8 + col
+        pin_mask = self.pinMasks.get(sq)
+        allowed = self.checkMask if pin_mask is None else pin_mask & self.checkMask
+        if not allowed:
+            return
         if self.whiteToMove:
             enemy_color = "b"
         else:
             enemy_color = "w"
-        for m in possibly_moves:
-            for k in range(1, 8):
-                end_row = row + m[0]
-                end_col = col + m[1]
-                if 0 <= end_row < 8 and 0 <= end_col < 8:
-                    if not piece_pinned:
-                        endPiece = self.board[end_row][end_col]
-                        if endPiece == "__":
-                            moves.append(Move((row, col), (end_row, end_col), self.board))
-                        elif endPiece[0] == enemy_color:
-                            moves.append(Move((row, col), (end_row, end_col), self.board))
-                            break
-                        else:
-                            break
-                    else:
-                        break
+        for d_row, d_col in directions:
+            end_row = row + d_row
+            end_col = col + d_col
+            # a pinned piece only has the two directions along its pin
+            if pin_mask is not None and (not (0 <= end_row < 8 and 0 <= end_col < 8) or
+                                         not pin_mask >> (end_row * 8 + end_col) & 1):
+                continue
+            while 0 <= end_row < 8 and 0 <= end_col < 8:
+                end_piece = self.board[end_row][end_col]
+                if end_piece == "__":
+                    if allowed >> (end_row * 8 + end_col) & 1:
+                        moves.append(encode_move(sq, end_row * 8 + end_col))
+                else:
+                    if end_piece[0] == enemy_color and allowed >> (end_row * 8 + end_col) & 1:
+                        moves.append(encode_move(sq, end_row * 8 + end_col, CAPTURE))
+                    break
+                end_row += d_row
+                end_col += d_col
 
-    def get_bishop_moves(self, row: int, col: int, moves: list[Move]) -> None:
-        piece_pinned = False
-        pin_direction = ()
-        for i in range(len(self.pins) - 1, -1, -1):
-            if self.pins[i][0] == row and self.pins[i][1] == col:
-                piece_pinned = True
-                pin_direction = (self.pins[i][2], self.pins[i][3])
-                self.pins.remove(self.pins[i])
-                break
-        directions = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+    def get_rook_moves(self, row: int, col: int, moves: array) -> None:
+        self.get_slider_moves(row, col, moves, SLIDER_DIRECTIONS["R"])
+
+    def get_knight_moves(self, row: int, col: int, moves: array) -> None:
+        # a pinned knight can never stay on its line
+        if row * 8 + col in self.pinMasks:
+            return
+        allowed = self.checkMask
         if self.whiteToMove:
             enemy_color = "b"
         else:
             enemy_color = "w"
-        for directory in directions:
-            for k in range(1, 8):
-                end_row = row + directory[0] * k
-                end_col = col + directory[1] * k
-                if 0 <= end_row < 8 and 0 <= end_col < 8:
-                    if not piece_pinned or pin_direction == directory or pin_direction == (-directory[0], -directory[1]):
-                        end_piece = self.board[end_row][end_col]
-                        if end_piece == "__":
-                            moves.append(Move((row, col), (end_row, end_col), self.board))
-                        elif end_piece[0] == enemy_color:
-                            moves.append(Move((row, col), (end_row, end_col), self.board))
-                            break
-                        else:
-                            break
-                    else:
-                        break
-
-    def get_queen_moves(self, row: int, col: int, moves: list[Move]) -> None:
-        self.get_bishop_moves(row, col, moves)
-        self.get_rook_moves(row, col, moves)
+        for m in KNIGHT_JUMPS:
+            end_row = row + m[0]
+            end_col = col + m[1]
+            if 0 <= end_row < 8 and 0 <= end_col < 8 and allowed >> (end_row * 8 + end_col) & 1:
+                endPiece = self.board[end_row][end_col]
+                if endPiece == "__":
+                    moves.append(encode_move(row * 8 + col, end_row * 8 + end_col))
+                elif endPiece[0] == enemy_color:
+                    moves.append(encode_move(row * 8 + col, end_row * 8 + end_col, CAPTURE))
+
+    def get_bishop_moves(self, row: int, col: int, moves: array) -> None:
+        self.get_slider_moves(row, col, moves, SLIDER_DIRECTIONS["B"])
+
+    def get_queen_moves(self, row: int, col: int, moves: array) -> None:
+        self.get_slider_moves(row, col, moves, SLIDER_DIRECTIONS["Q"])
 
     def get_king_moves(self, row, col, moves) -> None:
-        # possiblyMoves = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
-        row_moves = (-1, -1, -1, 0, 0, 1, 1, 1)
-        col_moves = (-1, 0, 1, -1, 1, -1, 0, 1)
+        # attackedSquares was worked out once for the node with the king lifted off the board
+        attacked = self.attackedSquares
         if self.whiteToMove:
             ally = "w"
         else:
             ally = "b"
-        for k in range(8):
-            # end_row = row + possiblyMoves[k][0]
-            # end_col = col + possiblyMoves[k][1]
-            end_row = row + row_moves[k]
-            end_col = col + col_moves[k]
-            if 0 <= end_row < 8 and 0 <= end_col < 8:
+        for d_row, d_col in DIRECTIONS:
+            end_row = row + d_row
+            end_col = col + d_col
+            if 0 <= end_row < 8 and 0 <= end_col < 8 and not attacked >> (end_row * 8 + end_col) & 1:
                 end_piece = self.board[end_row][end_col]
                 if end_piece[0] != ally:
-                    if ally == "w":
-                        self.whiteKingLocation = (end_row, end_col)
-                    else:
-                        self.blackKingLocation = (end_row, end_col)
-                    in_check, pins, checks = self.check_pins_and_checks()
-                    if not in_check:
-                        moves.append(Move((row, col), (end_row, end_col), self.board))
-                    if ally == "w":
-                        self.whiteKingLocation = (row, col)
-                    else:
-                        self.blackKingLocation = (row, col)
-
-    def update_castle_rights(self, move: Move) -> None:
-        if move.pieceMoved == "wK":
-            self.currentCastlingRight.white_king_castle = False
-            self.currentCastlingRight.white_queen_castle = False
-        elif move.pieceMoved == "bK":
-            self.currentCastlingRight.black_king_castle = False
-            self.currentCastlingRight.black_queen_castle = False
-        elif move.pieceMoved == "wR" or move.pieceCaptured == "wR":
-            if move.startRow == 7:
-                if move.startCol == 0:
-                    self.currentCastlingRight.white_queen_castle = False
-                elif move.startCol == 7:
-                    self.currentCastlingRight.white_king_castle = False
-        elif move.pieceMoved == "bR" or move.pieceCaptured == "bR":
-            if move.startRow == 7:
-                if move.startCol == 0:
-                    self.currentCastlingRight.black_queen_castle = False
-                elif move.startCol == 7:
-                    self.currentCastlingRight.black_King_castle = False
-
-    def get_castle_moves(self, row: int, col: int, moves: list[Move]) -> None:
-        if self.square_threatened(row, col):
+                    moves.append(encode_move(row * 8 + col, end_row * 8 + end_col,
+                                             QUIET if end_piece == "__" else CAPTURE))
+
+    def get_castle_moves(self, row: int, col: int, moves: array) -> None:
+        if self.attackedSquares >> (row * 8 + col) & 1:
             return
-        if (self.whiteToMove and self.currentCastlingRight.white_king_castle) or (
-                not self.whiteToMove and self.currentCastlingRight.black_king_castle):
+        if self.castlingBits & (WHITE_KING_CASTLE if self.whiteToMove else BLACK_KING_CASTLE):
             self.get_king_side_castle_moves(row, col, moves)
-        if (self.whiteToMove and self.currentCastlingRight.white_queen_castle) or (
-                not self.whiteToMove and self.currentCastlingRight.black_queen_castle):
+        if self.castlingBits & (WHITE_QUEEN_CASTLE if self.whiteToMove else BLACK_QUEEN_CASTLE):
             self.get_queen_side_castle_moves(row, col, moves)
 
-    def get_king_side_castle_moves(self, row: int, col: int, moves: list[Move]) -> None:
+    def get_king_side_castle_moves(self, row: int, col: int, moves: array) -> None:
         if self.board[row][col + 1] == '__' and self.board[row][col + 2] == '__':
-            if not self.square_threatened(row, col + 1) and not self.square_threatened(row, col + 2):
-                moves.append(Move((row, col), (row, col + 2), self.board, is_castle_move=True))
+            if not self.attackedSquares >> (row * 8 + col + 1) & 3:
+                moves.append(encode_move(row * 8 + col, row * 8 + col + 2, KING_CASTLE))
 
-    def get_queen_side_castle_moves(self, row: int, col: int, moves: list[Move]) -> None:
+    def get_queen_side_castle_moves(self, row: int, col: int, moves: array) -> None:
         if self.board[row][col - 1] == '__' and self.board[row][col - 2] == '__' and self.board[row][col - 3] == '__':
-            if not self.square_threatened(row, col - 1) and not self.square_threatened(row, col - 2):
-                moves.append(Move((row, col), (row, col - 2), self.board, is_castle_move=True))
+            if not self.attackedSquares >> (row * 8 + col - 2) & 3:
+                moves.append(encode_move(row * 8 + col, row * 8 + col - 2, QUEEN_CASTLE))
@@ -1,263 +1,606 @@
 import random
-import time
+from array import array
 from custom_chess.Classes.chessEngine import Gamestate
-from custom_chess.Classes.MoveClass import Move
+from custom_chess.Classes.TranspositionTable import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+from custom_chess.Classes.TimeManager import TimeManager
+from custom_chess.Classes.OpeningBook import OpeningBook
+from custom_chess.Classes.Tablebase import Tablebase
+from custom_chess.Classes.SearchStats import SearchStats
+from custom_chess.Classes.pieceSquareTables import piece_score
+from custom_chess.Classes.MoveClass import CAPTURE, ENPASSANT, PROMOTION, PROMOTION_PIECES
+from custom_chess.Classes.chessNotation import line_notation
 from multiprocessing import Process, Queue
 
-piece_score = {"K": 0, "Q": 9, "R": 5, "N": 3, "B": 3, "p": 1}
-CHECKMATE = 400
+# scores are integer centipawns from the side to move
+CHECKMATE = 40000
 STALEMATE = 0
 DEPTH = 4
-next_move = None
-counter = None
-transposition_table: dict = {}
-KILLER_MOVES = {depth: [None, None] for depth in range(DEPTH + 1)}
-
-knight_scores = [[0.0, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.0],
-                 [0.1, 0.3, 0.5, 0.5, 0.5, 0.5, 0.3, 0.1],
-                 [0.2, 0.5, 0.6, 0.65, 0.65, 0.6, 0.5, 0.2],
-                 [0.2, 0.55, 0.65, 0.7, 0.7, 0.65, 0.55, 0.2],
-                 [0.2, 0.5, 0.65, 0.7, 0.7, 0.65, 0.5, 0.2],
-                 [0.2, 0.55, 0.6, 0.65, 0.65, 0.6, 0.55, 0.2],
-                 [0.1, 0.3, 0.5, 0.55, 0.55, 0.5, 0.3, 0.1],
-                 [0.0, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.0]]
-
-bishop_scores = [[0.0, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.0],
-                 [0.2, 0.4, 0.4, 0.4, 0.4, 0.4, 0.4, 0.2],
-                 [0.2, 0.4, 0.5, 0.6, 0.6, 0.5, 0.4, 0.2],
-                 [0.2, 0.5, 0.5, 0.6, 0.6, 0.5, 0.5, 0.2],
-                 [0.2, 0.4, 0.6, 0.6, 0.6, 0.6, 0.4, 0.2],
-                 [0.2, 0.6, 0.6, 0.6, 0.6, 0.6, 0.6, 0.2],
-                 [0.2, 0.5, 0.4, 0.4, 0.4, 0.4, 0.5, 0.2],
-                 [0.0, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.0]]
-
-rook_scores = [[0.25, 0.25, 0.25, 0.25, 0.25, 0.25, 0.25, 0.25],
-               [0.5, 0.75, 0.75, 0.75, 0.75, 0.75, 0.75, 0.5],
-               [0.0, 0.25, 0.25, 0.25, 0.25, 0.25, 0.25, 0.0],
-               [0.0, 0.25, 0.25, 0.25, 0.25, 0.25, 0.25, 0.0],
-               [0.0, 0.25, 0.25, 0.25, 0.25, 0.25, 0.25, 0.0],
-               [0.0, 0.25, 0.25, 0.25, 0.25, 0.25, 0.25, 0.0],
-               [0.0, 0.25, 0.25, 0.25, 0.25, 0.25, 0.25, 0.0],
-               [0.25, 0.25, 0.25, 0.5, 0.5, 0.25, 0.25, 0.25]]
-
-queen_scores = [[0.0, 0.2, 0.2, 0.3, 0.3, 0.2, 0.2, 0.0],
-                [0.2, 0.4, 0.4, 0.4, 0.4, 0.4, 0.4, 0.2],
-                [0.2, 0.4, 0.5, 0.5, 0.5, 0.5, 0.4, 0.2],
-                [0.3, 0.4, 0.5, 0.5, 0.5, 0.5, 0.4, 0.3],
-                [0.4, 0.4, 0.5, 0.5, 0.5, 0.5, 0.4, 0.3],
-                [0.2, 0.5, 0.5, 0.5, 0.5, 0.5, 0.4, 0.2],
-                [0.2, 0.4, 0.5, 0.4, 0.4, 0.4, 0.4, 0.2],
-                [0.0, 0.2, 0.2, 0.3, 0.3, 0.2, 0.2, 0.0]]
-
-pawn_scores = [[0.8, 0.8, 0.8, 0.8, 0.8, 0.8, 0.8, 0.8],
-               [0.7, 0.7, 0.7, 0.7, 0.7, 0.7, 0.7, 0.7],
-               [0.3, 0.3, 0.4, 0.5, 0.5, 0.4, 0.3, 0.3],
-               [0.25, 0.25, 0.3, 0.45, 0.45, 0.3, 0.25, 0.25],
-               [0.2, 0.2, 0.2, 0.4, 0.4, 0.2, 0.2, 0.2],
-               [0.25, 0.15, 0.1, 0.2, 0.2, 0.1, 0.15, 0.25],
-               [0.25, 0.3, 0.3, 0.0, 0.0, 0.3, 0.3, 0.25],
-               [0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2]]
-
-piece_position_scores = {"wN": knight_scores,
-                         "bN": knight_scores[::-1],
-                         "wB": bishop_scores,
-                         "bB": bishop_scores[::-1],
-                         "wQ": queen_scores,
-                         "bQ": queen_scores[::-1],
-                         "wR": rook_scores,
-                         "bR": rook_scores[::-1],
-                         "wp": pawn_scores,
-                         "bp": pawn_scores[::-1]}
+SEARCH_TIME = 30
+TT_SIZE_MB = 16
+DELTA_MARGIN = 200
+ASPIRATION_WINDOW = 50
+NULL_WINDOW = 1
+LMR_MIN_DEPTH = 3
+LMR_MIN_MOVES = 4
+NULL_MOVE_MIN_DEPTH = 3
+# tablebase wins rank below mates found by the search and drop a centipawn per ply to the mate, table distances are
+# signed bytes so they never drop more than TABLEBASE_MAX_PLIES
+TABLEBASE_WIN = CHECKMATE // 2
+TABLEBASE_MAX_PLIES = 128
 
 
 def find_random(valid_moves: list):
     return valid_moves[random.randint(0, len(valid_moves) - 1)]
 
 
-def find_better_move_greedy(gamestate: Gamestate, validmoves: list[Move]):
-    player_multiplier: int = 0
-    # maxscore: int = -CHECKMATE
-    opponent_minmax: int = CHECKMATE
-    best_player_move = None
-    random.shuffle(validmoves)
-    if gamestate.whiteToMove:
-        player_multiplier = 1
-    elif not gamestate.whiteToMove:
-        player_multiplier = -1
-    for player_move in validmoves:
-        gamestate.make_move(player_move)
-        opponents_moves = gamestate.get_valid_moves_efficient()
-        if gamestate.checkmate:
-            opponent_max_score = -CHECKMATE
-        elif gamestate.stalemate:
-            opponent_max_score = STALEMATE
-        else:
-            opponent_max_score = -CHECKMATE
-            for opo_moves in opponents_moves:
-                gamestate.make_move(opo_moves)
-                if gamestate.checkmate:
-                    score = CHECKMATE
-                elif gamestate.stalemate:
-                    score = STALEMATE
-                else:
-                    score = -player_multiplier * scoreboard_simple(gamestate.board)
-                if score > opponent_max_score:
-                    opponent_max_score = score
-                    # best_move = player_move
+class Searcher:
+    # Everything one search needs: hash table, killers, history, book, endgame tables, limits and statistics.
+    # Searchers share no state, so several can search different games in one process, each from its own thread or
+    # task. One searcher runs one search at a time.
+
+    def __init__(self, size_mb: float = TT_SIZE_MB, transposition_table: TranspositionTable = None):
+        self.transpositionTable = transposition_table if transposition_table is not None else \
+            TranspositionTable(size_mb)
+        # grown to the deepest search asked for
+        self.killerMoves = {depth: [None, None] for depth in range(DEPTH + 1)}
+        # cutoff counts of quiet moves per side, indexed by the from and to squares of the move code
+        self.historyTable = [[0] * 4096, [0] * 4096]
+        self.nextMove = None
+        self.nodes = 0
+        self.searchDepth = DEPTH
+        self.timeManager = TimeManager()
+        self.openingBook = None
+        self.tablebase = None
+        # per-node counting (qnodes, hash hits and cutoffs) costs a little speed and can be switched off for play
+        self.collectStats = True
+        # figures of the running or last search, nodeStats is the same object while per-node counting is on
+        self.stats = SearchStats()
+        self.nodeStats = None
+        # JSON lines file every completed search is appended to
+        self.statsLog = None
+
+    def find_better_move_greedy(self, gamestate: Gamestate, validmoves: array):
+        self.nodes = 0
+        player_multiplier: int = 0
+        # maxscore: int = -CHECKMATE
+        opponent_minmax: int = CHECKMATE
+        best_player_move = None
+        random.shuffle(validmoves)
+        if gamestate.whiteToMove:
+            player_multiplier = 1
+        elif not gamestate.whiteToMove:
+            player_multiplier = -1
+        for player_move in validmoves:
+            gamestate.make_move(player_move)
+            self.nodes += 1
+            opponents_moves = gamestate.get_valid_moves_efficient()
+            if gamestate.checkmate:
+                opponent_max_score = -CHECKMATE
+            elif gamestate.stalemate:
+                opponent_max_score = STALEMATE
+            else:
+                opponent_max_score = -CHECKMATE
+                for opo_moves in opponents_moves:
+                    gamestate.make_move(opo_moves)
+                    self.nodes += 1
+                    if gamestate.checkmate:
+                        score = CHECKMATE
+                    elif gamestate.stalemate:
+                        score = STALEMATE
+                    else:
+                        score = -player_multiplier * scoreboard_simple(gamestate.board)
+                    if score > opponent_max_score:
+                        opponent_max_score = score
+                        # best_move = player_move
+                    gamestate.undo_move()
+            if opponent_max_score < opponent_minmax:
+                opponent_minmax = opponent_max_score
+                best_player_move = player_move
+            # start with player
+            """if gamestate.checkmate:
+                maxscore = CHECKMATE
+            elif gamestate.stalemate:
+                maxscore = STALEMATE
+            else:
+                score = player_multiplier * scoreboard_simple(gamestate.board)
+                if score > maxscore:
+                    maxscore = score
+                    best_player_move = player_move
+            gamestate.undoMove()"""
+            gamestate.undo_move()
+        return best_player_move
+
+    def find_better_move_recursive_minmax(self, gamestate: Gamestate, validmoves: array, depth: int,
+                                          player_turn: bool):
+        self.nodes += 1
+        if depth == 0:
+            return scoreboard_simple(gamestate.board)
+
+        if player_turn:
+            maxscore = -CHECKMATE
+            for move in validmoves:
+                gamestate.make_move(move)
+                next_valid_moves = gamestate.get_valid_moves_efficient()
+                score = self.find_better_move_recursive_minmax(gamestate, next_valid_moves, depth - 1, False)
+                if score > maxscore:
+                    maxscore = score
+                    if depth == self.searchDepth:
+                        self.nextMove = move
                 gamestate.undo_move()
-        if opponent_max_score < opponent_minmax:
-            opponent_minmax = opponent_max_score
-            best_player_move = player_move
-        # start with player
-        """if gamestate.checkmate:
-            maxscore = CHECKMATE
-        elif gamestate.stalemate:
-            maxscore = STALEMATE
-        else:
-            score = player_multiplier * scoreboard_simple(gamestate.board)
+            return maxscore
+
+        elif not player_turn:
+            minscore = CHECKMATE
+            for move in validmoves:
+                gamestate.make_move(move)
+                next_valid_moves = gamestate.get_valid_moves_efficient()
+                score = self.find_better_move_recursive_minmax(gamestate, next_valid_moves, depth - 1, True)
+                if score < minscore:
+                    minscore = score
+                    if depth == self.searchDepth:
+                        self.nextMove = move
+                gamestate.undo_move()
+            return minscore
+
+    def find_move_minmax(self, gamestate: Gamestate, validmoves: array, depth: int = DEPTH):
+        self.nextMove = None
+        self.nodes = 0
+        self.searchDepth = depth
+        self.find_better_move_recursive_minmax(gamestate, validmoves, depth, gamestate.whiteToMove)
+        return self.nextMove
+
+    def find_move_negamax(self, gamestate: Gamestate, validmoves: array, depth: int, turn_multi: int) -> int:
+        self.nodes += 1
+        if depth == 0:
+            return turn_multi * scoreboard_normal(gamestate)
+        maxscore = -CHECKMATE
+        for move in validmoves:
+            gamestate.make_move(move)
+            next_moves = gamestate.get_valid_moves_efficient()
+            score = - self.find_move_negamax(gamestate, next_moves, depth - 1, -turn_multi)
             if score > maxscore:
                 maxscore = score
-                best_player_move = player_move
-        gamestate.undoMove()"""
-        gamestate.undo_move()
-    return best_player_move
+                if depth == self.searchDepth:
+                    self.nextMove = move
+            gamestate.undo_move()
 
+        return maxscore
 
-def find_better_move_recursive_minmax(gamestate: Gamestate, validmoves: list[Move], depth: int, player_turn: bool):
-    global next_move
-    if depth == 0:
-        return scoreboard_simple(gamestate.board)
+    def find_bestmove_negamax(self, gamestate: Gamestate, validmoves: array, depth: int = DEPTH):
+        self.nextMove = None
+        self.nodes = 0
+        self.searchDepth = depth
+        random.shuffle(validmoves)
+        if gamestate.whiteToMove:
+            self.find_move_negamax(gamestate, validmoves, depth, 1)
+        elif not gamestate.whiteToMove:
+            self.find_move_negamax(gamestate, validmoves, depth, -1)
+
+        return self.nextMove
+
+    def find_bestmove_negamax_aplhabeta_pruned(self, gamestate: Gamestate, validmoves: array, alpha, beta, depth: int,
+                                               allow_null: bool = True) -> int:
+        board_key = gamestate.zobristKey
+        tt_move = 0
+        entry = self.transpositionTable.probe(board_key)
+        if self.nodeStats is not None:
+            self.nodeStats.ttProbes += 1
+        if entry is not None:
+            entry_depth, flag, evaluation, tt_move = entry
+            if self.nodeStats is not None:
+                self.nodeStats.ttHits += 1
+            if entry_depth >= depth and depth != self.searchDepth and (
+                    flag == EXACT or (flag == LOWER_BOUND and evaluation >= beta) or
+                    (flag == UPPER_BOUND and evaluation <= alpha)):
+                if self.nodeStats is not None:
+                    self.nodeStats.ttCutoffs += 1
+                return evaluation
+
+        self.nodes += 1
+        if self.timeManager.should_stop(self.nodes):
+            return 0
+        if gamestate.checkmate or gamestate.stalemate:
+            return scoreboard_normal(gamestate)
+        if self.tablebase is not None and depth != self.searchDepth:
+            score = self.probe_tablebase(gamestate)
+            if score is not None:
+                return score
+        if depth == 0:
+            return self.quiescence_search(gamestate, alpha, beta)
+        if allow_null and depth >= NULL_MOVE_MIN_DEPTH and depth != self.searchDepth and not gamestate.is_check() and \
+                self.null_move_prunes(gamestate, beta, depth, self.find_bestmove_negamax_aplhabeta_pruned):
+            return beta
+        alpha_start = alpha
+        maxscore = -CHECKMATE
+        best_move = 0
+        for i, move in enumerate(self.order_moves(gamestate, validmoves, tt_move, depth)):
+            gamestate.make_move(move)
+            next_moves = gamestate.get_valid_moves_efficient()
+            score = -self.find_bestmove_negamax_aplhabeta_pruned(gamestate, next_moves, -beta, -alpha, depth - 1)
+            gamestate.undo_move()
+            if self.timeManager.stopped:
+                return 0
+            if score > maxscore:
+                maxscore = score
+                best_move = move
+                if depth == self.searchDepth:
+                    self.nextMove = move
+            if maxscore > alpha:
+                alpha = maxscore
+            if alpha >= beta:
+                if move >> 12 < CAPTURE:
+                    self.update_quiet_history(gamestate, move, depth)
+                if self.nodeStats is not None:
+                    self.count_cutoff(i)
+                break
+
+        if maxscore <= alpha_start:
+            flag = UPPER_BOUND
+        elif maxscore >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.transpositionTable.store(board_key, depth, flag, maxscore, best_move)
+        return maxscore
 
-    if player_turn:
+    def find_bestmove_pvs(self, gamestate: Gamestate, validmoves: array, alpha, beta, depth: int,
+                          allow_null: bool = True):
+        # principal variation search: the first move gets the full window, the rest a null window that is only
+        # widened again when they beat alpha. Late quiet moves are searched a ply shallower first.
+        board_key = gamestate.zobristKey
+        tt_move = 0
+        entry = self.transpositionTable.probe(board_key)
+        if self.nodeStats is not None:
+            self.nodeStats.ttProbes += 1
+        if entry is not None:
+            entry_depth, flag, evaluation, tt_move = entry
+            if self.nodeStats is not None:
+                self.nodeStats.ttHits += 1
+            if entry_depth >= depth and depth != self.searchDepth and (
+                    flag == EXACT or (flag == LOWER_BOUND and evaluation >= beta) or
+                    (flag == UPPER_BOUND and evaluation <= alpha)):
+                if self.nodeStats is not None:
+                    self.nodeStats.ttCutoffs += 1
+                return evaluation
+
+        self.nodes += 1
+        if self.timeManager.should_stop(self.nodes):
+            return 0
+        if gamestate.checkmate or gamestate.stalemate:
+            return scoreboard_normal(gamestate)
+        if self.tablebase is not None and depth != self.searchDepth:
+            score = self.probe_tablebase(gamestate)
+            if score is not None:
+                return score
+        if depth == 0:
+            return self.quiescence_search(gamestate, alpha, beta)
+        in_check = gamestate.is_check()
+        # null moves are only tried off the principal variation, where the window is already null
+        if allow_null and depth >= NULL_MOVE_MIN_DEPTH and depth != self.searchDepth and not in_check and \
+                beta - alpha < 2 * NULL_WINDOW and \
+                self.null_move_prunes(gamestate, beta, depth, self.find_bestmove_pvs):
+            return beta
+        alpha_start = alpha
         maxscore = -CHECKMATE
-        for move in validmoves:
+        best_move = 0
+        for i, move in enumerate(self.order_moves(gamestate, validmoves, tt_move, depth)):
             gamestate.make_move(move)
-            next_valid_moves = gamestate.get_valid_moves_efficient()
-            score = find_better_move_recursive_minmax(gamestate, next_valid_moves, depth - 1, False)
+            next_moves = gamestate.get_valid_moves_efficient()
+            if i == 0:
+                score = -self.find_bestmove_pvs(gamestate, next_moves, -beta, -alpha, depth - 1)
+            else:
+                reduction = 0
+                if depth >= LMR_MIN_DEPTH and i >= LMR_MIN_MOVES and move >> 12 < CAPTURE and not in_check and \
+                        not gamestate.inCheckAtt and move not in self.killerMoves[depth]:
+                    reduction = 1 if i < 3 * LMR_MIN_MOVES else min(2, depth - 2)
+                score = -self.find_bestmove_pvs(gamestate, next_moves, -alpha - NULL_WINDOW, -alpha,
+                                                depth - 1 - reduction)
+                if score > alpha and reduction:
+                    score = -self.find_bestmove_pvs(gamestate, next_moves, -alpha - NULL_WINDOW, -alpha, depth - 1)
+                if alpha < score < beta:
+                    score = -self.find_bestmove_pvs(gamestate, next_moves, -beta, -alpha, depth - 1)
+            gamestate.undo_move()
+            if self.timeManager.stopped:
+                return 0
             if score > maxscore:
                 maxscore = score
-                if depth == DEPTH:
-                    next_move = move
+                best_move = move
+                if depth == self.searchDepth:
+                    self.nextMove = move
+            if maxscore > alpha:
+                alpha = maxscore
+            if alpha >= beta:
+                if move >> 12 < CAPTURE:
+                    self.update_quiet_history(gamestate, move, depth)
+                if self.nodeStats is not None:
+                    self.count_cutoff(i)
+                break
+
+        if maxscore <= alpha_start:
+            flag = UPPER_BOUND
+        elif maxscore >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.transpositionTable.store(board_key, depth, flag, maxscore, best_move)
+        return maxscore
+
+    def null_move_prunes(self, gamestate: Gamestate, beta, depth: int, search) -> bool:
+        # hand the opponent a free move: if a reduced search still fails high, a real move would too. Not done with
+        # only pawns left, where having to move can be the problem (zugzwang), nor when the static score is already
+        # below beta.
+        static_score = gamestate.boardScore if gamestate.whiteToMove else -gamestate.boardScore
+        if abs(beta) >= CHECKMATE or static_score < beta or not gamestate.has_non_pawn_material():
+            return False
+        reduction = 3 if depth > 6 else 2
+        gamestate.make_null_move()
+        next_moves = gamestate.get_valid_moves_efficient()
+        score = -search(gamestate, next_moves, -beta, -beta + NULL_WINDOW, max(depth - 1 - reduction, 0),
+                        allow_null=False)
+        gamestate.undo_null_move()
+        return score >= beta and not self.timeManager.stopped
+
+    def order_moves(self, gamestate: Gamestate, validmoves: array, tt_move: int, depth: int):
+        # staged picker: hash move, captures by MVV-LVA, killers, then quiet moves by history. A stage is only sorted
+        # once the earlier ones failed to cut off.
+        if tt_move and tt_move in validmoves:
+            yield tt_move
+        board = gamestate.board
+        captures = [move for move in validmoves if move >> 12 >= CAPTURE and move != tt_move]
+        captures.sort(key=lambda capture: mvv_lva(board, capture), reverse=True)
+        yield from captures
+
+        killers = [killer for killer in self.killerMoves[depth]
+                   if killer and killer != tt_move and killer >> 12 < CAPTURE and killer in validmoves]
+        yield from killers
+
+        history = self.historyTable[0 if gamestate.whiteToMove else 1]
+        quiets = [move for move in validmoves if move >> 12 < CAPTURE and move != tt_move and move not in killers]
+        quiets.sort(key=lambda quiet: history[quiet & 4095], reverse=True)
+        yield from quiets
+
+    def count_cutoff(self, move_number: int):
+        # how often the first move tried already fails high tells how good the move ordering is
+        self.nodeStats.betaCutoffs += 1
+        if move_number == 0:
+            self.nodeStats.firstMoveCutoffs += 1
+
+    def update_quiet_history(self, gamestate: Gamestate, move: int, depth: int):
+        killers = self.killerMoves[depth]
+        if move != killers[0]:
+            killers[1] = killers[0]
+            killers[0] = move
+        self.historyTable[0 if gamestate.whiteToMove else 1][move & 4095] += depth * depth
+
+    def quiescence_search(self, gamestate: Gamestate, alpha, beta):
+        # only captures and promotions past the horizon, so leaves are never scored in the middle of an exchange
+        self.nodes += 1
+        if self.nodeStats is not None:
+            self.nodeStats.qnodes += 1
+        if self.timeManager.should_stop(self.nodes):
+            return 0
+        captures = gamestate.get_valid_captures()
+        in_check = gamestate.inCheckAtt
+        if in_check:
+            if len(captures) == 0:
+                return -CHECKMATE
+            stand_pat = maxscore = -CHECKMATE
+        else:
+            stand_pat = maxscore = scoreboard_normal(gamestate)
+            if stand_pat >= beta:
+                return stand_pat
+            if stand_pat > alpha:
+                alpha = stand_pat
+        board = gamestate.board
+        for move in sorted(captures, key=lambda capture: mvv_lva(board, capture), reverse=True):
+            if not in_check:
+                flag = move >> 12
+                if flag & PROMOTION and flag & 3 != 3:
+                    continue
+                # delta pruning: even winning this piece cannot lift the score to alpha
+                if stand_pat + capture_gain(board, move) + DELTA_MARGIN <= alpha:
+                    continue
+            gamestate.make_move(move)
+            score = -self.quiescence_search(gamestate, -beta, -alpha)
             gamestate.undo_move()
+            if self.timeManager.stopped:
+                return 0
+            if score > maxscore:
+                maxscore = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
         return maxscore
 
-    elif not player_turn:
-        minscore = CHECKMATE
+    def load_opening_book(self, path: str = None):
+        # a Polyglot .bin file to play from before searching, None closes the current one
+        if self.openingBook is not None:
+            self.openingBook.close()
+        self.openingBook = OpeningBook(path) if path else None
+
+    def load_tablebase(self, directory: str = None):
+        # a directory of generated endgame tables, None closes the current ones
+        if self.tablebase is not None:
+            self.tablebase.close()
+        self.tablebase = Tablebase(directory) if directory else None
+
+    def open_stats_log(self, path: str = None):
+        # a JSON lines file to append the figures of every search to, None closes the current one
+        if self.statsLog is not None:
+            self.statsLog.close()
+        self.statsLog = open(path, "a") if path else None
+
+    def probe_tablebase(self, gamestate: Gamestate):
+        value = self.tablebase.probe(gamestate)
+        if value is None:
+            return None
+        if value > 0:
+            return TABLEBASE_WIN - value
+        if value < 0:
+            return -TABLEBASE_WIN - (value + 1)
+        return 0
+
+    def probe_root(self, gamestate: Gamestate, validmoves: array):
+        # (move, score) for a book move, or the move keeping the best tablebase result (the fastest win, the longest
+        # defence). A book gives no score, so a book move gets the static one of the position.
+        if self.openingBook is not None:
+            book_move = self.openingBook.choose_move(gamestate)
+            if book_move is not None:
+                return book_move, scoreboard_normal(gamestate)
+        if self.tablebase is None or not validmoves or self.tablebase.probe(gamestate) is None:
+            return None
+        best_move, best_score = None, -CHECKMATE
         for move in validmoves:
             gamestate.make_move(move)
-            next_valid_moves = gamestate.get_valid_moves_efficient()
-            score = find_better_move_recursive_minmax(gamestate, next_valid_moves, depth - 1, True)
-            if score < minscore:
-                minscore = score
-                if depth == DEPTH:
-                    next_move = move
+            score = self.probe_tablebase(gamestate)
+            gamestate.undo_move()
+            if score is None:
+                return None
+            if -score > best_score:
+                best_move, best_score = move, -score
+        return best_move, best_score
+
+    def find_move_iterative(self, gamestate: Gamestate, validmoves: array, max_depth: int = DEPTH,
+                            timer: TimeManager = None, info_callback=None, use_pvs: bool = False):
+        # info_callback(depth, score, nodes, elapsed, pv) is called after every completed depth, or once with depth 0
+        # for a book or tablebase move. Depth 1 is never
+        # aborted and a later aborted depth is thrown away, the move returned is always the one from the last depth
+        # that finished. use_pvs switches to principal variation search with aspiration windows around the previous
+        # depth's score.
+        self.stats = SearchStats(self.collectStats)
+        if not validmoves:
+            # checkmate or stalemate, there is no move to look for
+            return None
+        root = self.probe_root(gamestate, validmoves)
+        if root is not None:
+            self.stats.bestMove, self.stats.score = root
+            if info_callback is not None:
+                info_callback(0, root[1], 0, 0.0, [root[0]])
+            return root[0]
+        self.nodeStats = self.stats if self.collectStats else None
+        self.nodes = 0
+        self.timeManager = timer if timer is not None else TimeManager()
+        self.timeManager.start()
+        random.shuffle(validmoves)
+        self.nextMove = None
+        best_move = None
+        self.transpositionTable.new_search()
+        for history in self.historyTable:
+            for i in range(4096):
+                history[i] >>= 1
+        if len(self.killerMoves) <= max_depth:
+            self.killerMoves = {depth: [None, None] for depth in range(max_depth + 1)}
+
+        score = 0
+        for depth in range(1, max_depth + 1):
+            self.searchDepth = depth
+            self.timeManager.armed = depth > 1
+            if not use_pvs:
+                score = self.find_bestmove_negamax_aplhabeta_pruned(gamestate, validmoves, alpha=-CHECKMATE,
+                                                                    beta=CHECKMATE, depth=depth)
+            elif depth < 3 or abs(score) >= CHECKMATE:
+                score = self.find_bestmove_pvs(gamestate, validmoves, -CHECKMATE, CHECKMATE, depth)
+            else:
+                window = ASPIRATION_WINDOW
+                alpha, beta = score - window, score + window
+                while True:
+                    score = self.find_bestmove_pvs(gamestate, validmoves, alpha, beta, depth)
+                    if self.timeManager.stopped:
+                        break
+                    # a fail low or high only bounds the score, so widen that side and search again
+                    if score <= alpha and alpha > -CHECKMATE:
+                        window *= 2
+                        alpha = max(score - window, -CHECKMATE)
+                    elif score >= beta and beta < CHECKMATE:
+                        window *= 2
+                        beta = min(score + window, CHECKMATE)
+                    else:
+                        break
+            if self.timeManager.stopped:
+                break
+            best_move = self.nextMove
+            if best_move is None:
+                # every move is mated within the depth, they all score the same
+                best_move = validmoves[0]
+            elapsed = self.timeManager.elapsed()
+            pv = self.get_principal_variation(gamestate, depth)
+            self.stats.complete_iteration(depth, score, self.nodes, elapsed, line_notation(gamestate, pv))
+            if info_callback is not None:
+                info_callback(depth, score, self.nodes, elapsed, pv)
+            if not self.timeManager.can_start_iteration():
+                break
+        self.stats.finish(best_move, self.nodes, self.timeManager.elapsed())
+        self.nodeStats = None
+        if self.statsLog is not None:
+            self.stats.write(self.statsLog, fen=gamestate.to_fen())
+        return best_move
+
+    def search_with_stats(self, gamestate: Gamestate, validmoves: array, max_depth: int = DEPTH,
+                          timer: TimeManager = None, use_pvs: bool = False) -> SearchStats:
+        # the same search, handing back its figures with the chosen move in bestMove
+        self.find_move_iterative(gamestate, validmoves, max_depth, timer, use_pvs=use_pvs)
+        return self.stats
+
+    def get_principal_variation(self, gamestate: Gamestate, depth: int) -> list:
+        # follow the hash moves from the root, checking each one is legal since entries can be overwritten
+        pv = []
+        while len(pv) < depth:
+            entry = self.transpositionTable.probe(gamestate.zobristKey)
+            if entry is None or not entry[3] or entry[3] not in gamestate.get_valid_moves_efficient():
+                break
+            pv.append(entry[3])
+            gamestate.make_move(entry[3])
+        for _ in pv:
             gamestate.undo_move()
-        return minscore
+        return pv
 
+    def clear_search_tables(self):
+        # forget everything learnt from earlier searches, so the next one runs as in a fresh process
+        self.transpositionTable.clear()
+        for history in self.historyTable:
+            for i in range(4096):
+                history[i] = 0
+        self.killerMoves = {depth: [None, None] for depth in range(len(self.killerMoves))}
 
-def find_move_negamax(gamestate: Gamestate, validmoves: list, depth: int, turn_multi: int) -> int:
-    global next_move
-    if depth == 0:
-        return turn_multi * scoreboard_normal(gamestate)
-    maxscore = -CHECKMATE
-    for move in validmoves:
-        gamestate.make_move(move)
-        next_moves = gamestate.get_valid_moves_efficient()
-        score = - find_move_negamax(gamestate, next_moves, depth - 1, -turn_multi)
-        if score > maxscore:
-            maxscore = score
-            if depth == DEPTH:
-                next_move = move
-        gamestate.undo_move()
 
-    return maxscore
+# one-shot move finders for callers without a searcher of their own, every call starts from empty tables. The
+# first three never touch the hash table, so theirs is a single bucket.
+def find_better_move_greedy(gamestate: Gamestate, validmoves: array):
+    return Searcher(0).find_better_move_greedy(gamestate, validmoves)
 
 
-def find_bestmove_negamax(gamestate: Gamestate, validmoves: list[Move]):
-    global next_move
-    next_move = None
-    random.shuffle(validmoves)
-    if gamestate.whiteToMove:
-        find_move_negamax(gamestate, validmoves, DEPTH, 1)
-    elif not gamestate.whiteToMove:
-        find_move_negamax(gamestate, validmoves, DEPTH, -1)
-
-    return next_move
-
-
-def find_bestmove_negamax_aplhabeta_pruned(gamestate: Gamestate, validmoves: list, alpha, beta, depth: int) -> int:
-    global next_move, counter, transposition_table, KILLER_MOVES
-    #board_key = board_to_key(gamestate.board)
-    #R = 3  # Reduction factor
-    #null_move_depth = depth - R
-
-    for killer in KILLER_MOVES[depth]:
-        if killer in validmoves:
-            validmoves.remove(killer)
-            validmoves.insert(0, killer)
-
-    #if is_null_move_allowed and depth >= 4 and not gamestate.is_check():
-        #gamestate.whiteToMove = not gamestate.whiteToMove  # Make null move
-        #evalu = -find_bestmove_negamax_aplhabeta_pruned(gamestate, validmoves, null_move_depth, -beta, -beta + 1,
-                                                       # -turn_multi, False)
-       # gamestate.whiteToMove = not gamestate.whiteToMove  # Undo null move
-
-        #if evalu >= beta:
-           # return beta
-
-    #if transposition_table.get(board_key, None) is not None:
-        #entry = transposition_table[board_key]
-        #if entry['depth'] >= depth:
-            #return entry['evaluation']
-
-    counter += 1
-    if depth == 0:
-        return scoreboard_normal(gamestate)
-    maxscore = -CHECKMATE
-    for move in validmoves:
-        gamestate.make_move(move)
-        next_moves = gamestate.get_valid_moves_efficient()
-        score = -find_bestmove_negamax_aplhabeta_pruned(gamestate, next_moves, -beta, -alpha, depth - 1)
-        if score > maxscore:
-            maxscore = score
-            if depth == DEPTH:
-                next_move = move
-        gamestate.undo_move()
-        if maxscore > alpha:
-            alpha = maxscore
-        if alpha >= beta:
-            if move not in KILLER_MOVES[depth]:
-                KILLER_MOVES[depth].pop()
-                KILLER_MOVES[depth].insert(0, move)
-            break
-
-    #transposition_table[board_key] = {'depth': depth, 'evaluation': maxscore, 'best_move': next_move}
-    return maxscore
-
-
-def find_move_nega_alphabeta(gamestate: Gamestate, validmoves: list[Move], decision_queue: Queue):
-    global next_move, counter
-    counter = 0
-    timer = time.time()
-    random.shuffle(validmoves)
-    next_move = None
-
-    for depth in range(1, DEPTH + 1):
-        if gamestate.whiteToMove:
-            find_bestmove_negamax_aplhabeta_pruned(gamestate, validmoves, alpha=-CHECKMATE, beta=CHECKMATE, depth=depth)
-        elif not gamestate.whiteToMove:
-            find_bestmove_negamax_aplhabeta_pruned(gamestate, validmoves, alpha=-CHECKMATE, beta=CHECKMATE, depth=depth)
-        if time.time() - timer > 30:
-            break
-    decision_queue.put(next_move)
-    print(decision_queue)
-    # return next_move
+def find_move_minmax(gamestate: Gamestate, validmoves: array, depth: int = DEPTH):
+    return Searcher(0).find_move_minmax(gamestate, validmoves, depth)
 
 
-def find_move_minmax(gamestate: Gamestate, validmoves: list[Move]):
-    global next_move
-    next_move = None
-    find_better_move_recursive_minmax(gamestate, validmoves, DEPTH, gamestate.whiteToMove)
+def find_bestmove_negamax(gamestate: Gamestate, validmoves: array, depth: int = DEPTH):
+    return Searcher(0).find_bestmove_negamax(gamestate, validmoves, depth)
+
+
+def find_move_nega_alphabeta(gamestate: Gamestate, validmoves: array, decision_queue: Queue):
+    decision_queue.put(Searcher().find_move_iterative(gamestate, validmoves,
+                                                      timer=TimeManager.from_movetime(SEARCH_TIME)))
+
+
+def capture_gain(board, move: int) -> int:
+    # material won by a capture or promotion, in centipawns
+    end_row, end_col = divmod((move >> 6) & 63, 8)
+    flag = move >> 12
+    if flag == ENPASSANT:
+        gain = piece_score["p"]
+    else:
+        victim = board[end_row][end_col]
+        gain = piece_score[victim[1]] if victim != "__" else 0
+    if flag & PROMOTION:
+        gain += piece_score[PROMOTION_PIECES[flag & 3]] - piece_score["p"]
+    return 100 * gain
+
+
+def mvv_lva(board, move: int) -> int:
+    # most valuable victim first, least valuable attacker breaking ties
+    start_row, start_col = divmod(move & 63, 8)
+    return 10 * capture_gain(board, move) - 100 * piece_score[board[start_row][start_col][1]]
 
 
 def scoreboard_simple(board: list[str]):
@@ -269,60 +612,24 @@ def scoreboard_simple(board: list[str]):
             elif square[0] == "b":
                 score -= piece_score[square[1]]
 
-    return score
+    return 100 * score
 
 
 def scoreboard_normal(gamestate: Gamestate):
+    # scores are from the side to move, so being mated is always the worst result
     if gamestate.checkmate:
-        if gamestate.whiteToMove:
-            return -CHECKMATE
-        elif not gamestate.whiteToMove:
-            return CHECKMATE
+        return -CHECKMATE
     elif gamestate.stalemate:
         return 0
 
-    score = 0
-    for row in range(len(gamestate.board)):
-        for col in range(len(gamestate.board[row])):
-            piece = gamestate.board[row][col]
-            if piece != "__":
-                piece_position_score = 0
-                if piece[1] != "K":
-                    piece_position_score = piece_position_scores[piece][row][col]
-                if piece[0] == "w":
-                    score += piece_score[piece[1]] + piece_position_score
-                if piece[0] == "b":
-                    score -= piece_score[piece[1]] + piece_position_score
-
-    if gamestate.is_check() and gamestate.whiteToMove:
-        score += 2
-    elif gamestate.is_check() and not gamestate.whiteToMove:
-        score -= 2
+    score = gamestate.boardScore
+    # inCheckAtt was set when the moves of this position were generated, which the search always does first
+    if gamestate.inCheckAtt and gamestate.whiteToMove:
+        score += 200
+    elif gamestate.inCheckAtt and not gamestate.whiteToMove:
+        score -= 200
 
     if gamestate.whiteToMove:
         return score
     else:
         return -score
-
-
-    """
-    score = 0
-    for row in range(len(gamestate.board)):
-        for col in range(len(gamestate.board[row])):
-            piece = gamestate.board[row][col]
-            if piece != "__":
-                piece_position_score = 0
-                if piece[1] != "K":
-                    piece_position_score = piece_position_scores[piece][row][col]
-                if piece[0] == "w":
-                    score += piece_score[piece[1]] + piece_position_score
-                if piece[0] == "b":
-                    score -= piece_score[piece[1]] + piece_position_score
-
-    return score
-"""
-
-
-def board_to_key(board) -> tuple:
-    # Flatten the board and convert it to a tuple for immutability
-    return tuple(item for row in board for item in row)
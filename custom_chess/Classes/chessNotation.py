@@ -0,0 +1,176 @@
+import re
+from custom_chess.Classes.CastleRights import CastleRights
+from custom_chess.Classes.MoveClass import Move, KING_CASTLE, QUEEN_CASTLE, PROMOTION, PROMOTION_PIECES
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+SAN_PATTERN = re.compile(r"([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?")
+TAG_PATTERN = re.compile(r'\[\s*(\w+)\s+"(.*)"\s*\]')
+MOVETEXT_TOKEN = re.compile(r"[{}();]|[^\s{}();]+")
+MOVE_NUMBER = re.compile(r"^\d+\.+")
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+
+
+def parse_fen(fen: str) -> tuple:
+    fields = fen.split()
+    board = []
+    for rank in fields[0].split("/"):
+        row = []
+        for symbol in rank:
+            if symbol.isdigit():
+                row.extend(["__"] * int(symbol))
+            elif symbol.isupper():
+                row.append("w" + symbol if symbol != "P" else "wp")
+            else:
+                row.append("b" + symbol.upper() if symbol != "p" else "bp")
+        board.append(row)
+    white_to_move = len(fields) < 2 or fields[1] == "w"
+    castling = fields[2] if len(fields) > 2 else "-"
+    castle_rights = CastleRights("K" in castling, "k" in castling, "Q" in castling, "q" in castling)
+    enpassant = ()
+    if len(fields) > 3 and fields[3] != "-":
+        enpassant = (Move.ranksToRows[fields[3][1]], Move.filesToCols[fields[3][0]])
+    halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+    fullmove_number = int(fields[5]) if len(fields) > 5 else 1
+    return board, white_to_move, castle_rights, enpassant, halfmove_clock, fullmove_number
+
+
+def make_fen(board, white_to_move: bool, castle_rights: CastleRights, enpassant: tuple, halfmove_clock: int = 0,
+             fullmove_number: int = 1) -> str:
+    ranks = []
+    for row in board:
+        rank = ""
+        empty = 0
+        for piece in row:
+            if piece == "__":
+                empty += 1
+                continue
+            if empty:
+                rank += str(empty)
+                empty = 0
+            rank += piece[1].upper() if piece[0] == "w" else piece[1].lower()
+        ranks.append(rank + str(empty) if empty else rank)
+    castling = ("K" if castle_rights.white_king_castle else "") + ("Q" if castle_rights.white_queen_castle else "") + \
+               ("k" if castle_rights.black_king_castle else "") + ("q" if castle_rights.black_queen_castle else "")
+    square = Move.colsToFiles[enpassant[1]] + Move.rowsToRanks[enpassant[0]] if enpassant else "-"
+    return f"{'/'.join(ranks)} {'w' if white_to_move else 'b'} {castling or '-'} {square} " \
+           f"{halfmove_clock} {fullmove_number}"
+
+
+def parse_epd(line: str) -> tuple:
+    # four FEN fields, optional move counters, then "opcode operand;" operations, e.g. bm Nf3; id "WAC.001";
+    # the hmvc and fmvn operations fill in the counters. Returns a full FEN and the operations by opcode.
+    position, _, rest = line.partition(";")
+    fields = position.split()
+    counters = fields[4:6] if len(fields) >= 6 and fields[4].isdigit() and fields[5].isdigit() else []
+    operations = {}
+    for operation in [" ".join(fields[4 + len(counters):])] + rest.split(";"):
+        opcode, _, operand = operation.strip().partition(" ")
+        if opcode:
+            operations[opcode] = operand.strip().strip('"')
+    halfmove_clock = counters[0] if counters else operations.get("hmvc", "0")
+    fullmove_number = counters[1] if counters else operations.get("fmvn", "1")
+    return f"{' '.join(fields[:4])} {halfmove_clock} {fullmove_number}", operations
+
+
+def read_epd(source):
+    # yields (fen, operations) one line at a time from a path or any iterable of lines, so files of any size
+    # stream through without being loaded; blank lines and # comments are skipped
+    if isinstance(source, str):
+        with open(source) as file:
+            yield from read_epd(file)
+        return
+    for line in source:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield parse_epd(line)
+
+
+def parse_san(gamestate, san: str, validmoves=None) -> int:
+    # the move code of a SAN move such as Nbd7, exd5, e8=Q+ or O-O in the current position
+    text = san.rstrip("+#!?")
+    if validmoves is None:
+        validmoves = gamestate.get_valid_moves_efficient()
+    if text in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        flag = KING_CASTLE if len(text) == 3 else QUEEN_CASTLE
+        for move in validmoves:
+            if move >> 12 == flag:
+                return move
+        raise ValueError(f"illegal move {san}")
+    match = SAN_PATTERN.fullmatch(text)
+    if match is None:
+        raise ValueError(f"unreadable move {san}")
+    piece, file, rank, target, promotion = match.groups()
+    piece = piece or "p"
+    end = Move.ranksToRows[target[1]] * 8 + Move.filesToCols[target[0]]
+    found = []
+    for move in validmoves:
+        if (move >> 6) & 63 != end:
+            continue
+        start_row, start_col = divmod(move & 63, 8)
+        flag = move >> 12
+        if gamestate.board[start_row][start_col][1] != piece or \
+                (file is not None and Move.filesToCols[file] != start_col) or \
+                (rank is not None and Move.ranksToRows[rank] != start_row) or \
+                (PROMOTION_PIECES[flag & 3] if flag & PROMOTION else None) != promotion:
+            continue
+        found.append(move)
+    if len(found) != 1:
+        raise ValueError(f"{'ambiguous' if found else 'illegal'} move {san}")
+    return found[0]
+
+
+def line_notation(gamestate, moves) -> list:
+    # long algebraic notation of a line of move codes played from the current position, which is left as it was
+    notation = []
+    for move in moves:
+        notation.append(Move.from_code(move, gamestate.board).get_chess_notation())
+        gamestate.make_move(move)
+    for _ in notation:
+        gamestate.undo_move()
+    return notation
+
+
+def read_pgn(source):
+    # yields (tags, SAN moves) per game from a path or any iterable of lines. Only the current game is held in
+    # memory; comments, variations, NAGs and move numbers are dropped.
+    if isinstance(source, str):
+        with open(source, encoding="utf-8", errors="replace") as file:
+            yield from read_pgn(file)
+        return
+    tags, moves = {}, []
+    comment = False
+    variation = 0
+    for line in source:
+        if not comment and not variation and line.startswith("["):
+            if moves:
+                yield tags, moves
+                tags, moves = {}, []
+            match = TAG_PATTERN.match(line)
+            if match is not None:
+                tags[match.group(1)] = match.group(2).replace('\\"', '"')
+            continue
+        if line.startswith("%"):
+            continue
+        for token in MOVETEXT_TOKEN.findall(line):
+            if comment:
+                comment = token != "}"
+            elif token == "{":
+                comment = True
+            elif token == ";":
+                break
+            elif token == "(":
+                variation += 1
+            elif token == ")":
+                variation = max(variation - 1, 0)
+            elif variation or token.startswith("$"):
+                continue
+            elif token in RESULTS:
+                tags.setdefault("Result", token)
+                yield tags, moves
+                tags, moves = {}, []
+            else:
+                token = MOVE_NUMBER.sub("", token)
+                if token:
+                    moves.append(token)
+    if moves:
+        yield tags, moves
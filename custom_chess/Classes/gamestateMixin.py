@@ -0,0 +1,58 @@
+from custom_chess.Classes.CastleRights import CastleRights
+from custom_chess.Classes.chessNotation import make_fen
+from custom_chess.Classes.zobristKeys import WHITE_TO_MOVE_KEY, enpassant_key
+from custom_chess.Classes.stateStack import STATE_PIECES, PIECE_CODES, ENPASSANT_SQUARES, ENPASSANT_CODES, \
+    castle_rights, new_stack, grow_stack
+
+
+class GamestateMixin:
+    # What Gamestate and BitboardGamestate keep the same way: castling bits, en passant square, halfmove clock and
+    # key of every ply on the state stack, null moves and FEN output. Both keep board, whiteToMove, castlingBits,
+    # enpassantPossible, halfmoveClock, fullmoveNumber and zobristKey as attributes.
+
+    def new_state_stack(self) -> None:
+        # irreversible state of every ply played, see stateStack
+        self.stateStack = new_stack()
+        self.keyStack = new_stack()
+        self.ply = 0
+
+    def to_fen(self) -> str:
+        return make_fen(self.board, self.whiteToMove, self.currentCastlingRight, self.enpassantPossible,
+                        self.halfmoveClock, self.fullmoveNumber)
+
+    @property
+    def currentCastlingRight(self) -> CastleRights:
+        return castle_rights(self.castlingBits)
+
+    def push_state(self, piece_captured: str) -> None:
+        ply = self.ply
+        if ply == len(self.stateStack):
+            grow_stack(self.stateStack)
+            grow_stack(self.keyStack)
+        self.stateStack[ply] = self.castlingBits | ENPASSANT_CODES[self.enpassantPossible] << 4 | \
+            PIECE_CODES[piece_captured] << 11 | self.halfmoveClock << 15
+        self.keyStack[ply] = self.zobristKey
+        self.ply = ply + 1
+
+    def pop_state(self) -> str:
+        # restores the state of the ply and hands back the captured piece
+        self.ply -= 1
+        state = self.stateStack[self.ply]
+        self.castlingBits = state & 15
+        self.enpassantPossible = ENPASSANT_SQUARES[state >> 4 & 127]
+        self.halfmoveClock = state >> 15
+        self.zobristKey = self.keyStack[self.ply]
+        return STATE_PIECES[state >> 11 & 15]
+
+    def make_null_move(self) -> None:
+        # pass the turn: the en passant chance is lost, castling rights and the board stay as they are
+        self.push_state("__")
+        self.zobristKey ^= enpassant_key(self.board, self.enpassantPossible, self.whiteToMove) ^ WHITE_TO_MOVE_KEY
+        self.whiteToMove = not self.whiteToMove
+        self.enpassantPossible = ()
+
+    def undo_null_move(self) -> None:
+        self.pop_state()
+        self.whiteToMove = not self.whiteToMove
+        self.checkmate = False
+        self.stalemate = False
@@ -0,0 +1,100 @@
+from custom_chess.Classes.MoveClass import KING_CASTLE, QUEEN_CASTLE, ENPASSANT, PROMOTION, PROMOTION_PIECES
+
+piece_score = {"K": 0, "Q": 9, "R": 5, "N": 3, "B": 3, "p": 1}
+
+knight_scores = [[0.0, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.0],
+                 [0.1, 0.3, 0.5, 0.5, 0.5, 0.5, 0.3, 0.1],
+                 [0.2, 0.5, 0.6, 0.65, 0.65, 0.6, 0.5, 0.2],
+                 [0.2, 0.55, 0.65, 0.7, 0.7, 0.65, 0.55, 0.2],
+                 [0.2, 0.5, 0.65, 0.7, 0.7, 0.65, 0.5, 0.2],
+                 [0.2, 0.55, 0.6, 0.65, 0.65, 0.6, 0.55, 0.2],
+                 [0.1, 0.3, 0.5, 0.55, 0.55, 0.5, 0.3, 0.1],
+                 [0.0, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.0]]
+
+bishop_scores = [[0.0, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.0],
+                 [0.2, 0.4, 0.4, 0.4, 0.4, 0.4, 0.4, 0.2],
+                 [0.2, 0.4, 0.5, 0.6, 0.6, 0.5, 0.4, 0.2],
+                 [0.2, 0.5, 0.5, 0.6, 0.6, 0.5, 0.5, 0.2],
+                 [0.2, 0.4, 0.6, 0.6, 0.6, 0.6, 0.4, 0.2],
+                 [0.2, 0.6, 0.6, 0.6, 0.6, 0.6, 0.6, 0.2],
+                 [0.2, 0.5, 0.4, 0.4, 0.4, 0.4, 0.5, 0.2],
+                 [0.0, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.0]]
+
+rook_scores = [[0.25, 0.25, 0.25, 0.25, 0.25, 0.25, 0.25, 0.25],
+               [0.5, 0.75, 0.75, 0.75, 0.75, 0.75, 0.75, 0.5],
+               [0.0, 0.25, 0.25, 0.25, 0.25, 0.25, 0.25, 0.0],
+               [0.0, 0.25, 0.25, 0.25, 0.25, 0.25, 0.25, 0.0],
+               [0.0, 0.25, 0.25, 0.25, 0.25, 0.25, 0.25, 0.0],
+               [0.0, 0.25, 0.25, 0.25, 0.25, 0.25, 0.25, 0.0],
+               [0.0, 0.25, 0.25, 0.25, 0.25, 0.25, 0.25, 0.0],
+               [0.25, 0.25, 0.25, 0.5, 0.5, 0.25, 0.25, 0.25]]
+
+queen_scores = [[0.0, 0.2, 0.2, 0.3, 0.3, 0.2, 0.2, 0.0],
+                [0.2, 0.4, 0.4, 0.4, 0.4, 0.4, 0.4, 0.2],
+                [0.2, 0.4, 0.5, 0.5, 0.5, 0.5, 0.4, 0.2],
+                [0.3, 0.4, 0.5, 0.5, 0.5, 0.5, 0.4, 0.3],
+                [0.4, 0.4, 0.5, 0.5, 0.5, 0.5, 0.4, 0.3],
+                [0.2, 0.5, 0.5, 0.5, 0.5, 0.5, 0.4, 0.2],
+                [0.2, 0.4, 0.5, 0.4, 0.4, 0.4, 0.4, 0.2],
+                [0.0, 0.2, 0.2, 0.3, 0.3, 0.2, 0.2, 0.0]]
+
+pawn_scores = [[0.8, 0.8, 0.8, 0.8, 0.8, 0.8, 0.8, 0.8],
+               [0.7, 0.7, 0.7, 0.7, 0.7, 0.7, 0.7, 0.7],
+               [0.3, 0.3, 0.4, 0.5, 0.5, 0.4, 0.3, 0.3],
+               [0.25, 0.25, 0.3, 0.45, 0.45, 0.3, 0.25, 0.25],
+               [0.2, 0.2, 0.2, 0.4, 0.4, 0.2, 0.2, 0.2],
+               [0.25, 0.15, 0.1, 0.2, 0.2, 0.1, 0.15, 0.25],
+               [0.25, 0.3, 0.3, 0.0, 0.0, 0.3, 0.3, 0.25],
+               [0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2]]
+
+piece_position_scores = {"wN": knight_scores,
+                         "bN": knight_scores[::-1],
+                         "wB": bishop_scores,
+                         "bB": bishop_scores[::-1],
+                         "wQ": queen_scores,
+                         "bQ": queen_scores[::-1],
+                         "wR": rook_scores,
+                         "bR": rook_scores[::-1],
+                         "wp": pawn_scores,
+                         "bp": pawn_scores[::-1]}
+
+# material plus position for every piece on every square (square = row * 8 + col) in centipawns, negative for black,
+# so the board score is a plain sum that make_move and undo_move can keep up to date
+PIECE_SQUARE_SCORES = {"__": [0] * 64}
+for _piece in ("wp", "wN", "wB", "wR", "wQ", "wK", "bp", "bN", "bB", "bR", "bQ", "bK"):
+    _sign = 1 if _piece[0] == "w" else -1
+    PIECE_SQUARE_SCORES[_piece] = [
+        _sign * round(100 * (piece_score[_piece[1]] +
+                             (piece_position_scores[_piece][sq // 8][sq % 8] if _piece[1] != "K" else 0)))
+        for sq in range(64)]
+
+
+def compute_score(board) -> int:
+    score = 0
+    for row in range(8):
+        for col in range(8):
+            score += PIECE_SQUARE_SCORES[board[row][col]][row * 8 + col]
+    return score
+
+
+def move_score(move: int, piece_moved: str, piece_captured: str) -> int:
+    # change of the board score when the move is made, undo_move subtracts the same amount
+    start_sq = move & 63
+    end_sq = (move >> 6) & 63
+    flag = move >> 12
+    score = -PIECE_SQUARE_SCORES[piece_moved][start_sq]
+    if flag & PROMOTION:
+        score += PIECE_SQUARE_SCORES[piece_moved[0] + PROMOTION_PIECES[flag & 3]][end_sq]
+    else:
+        score += PIECE_SQUARE_SCORES[piece_moved][end_sq]
+    if flag == ENPASSANT:
+        score -= PIECE_SQUARE_SCORES[piece_captured][(start_sq & ~7) | (end_sq & 7)]
+    else:
+        score -= PIECE_SQUARE_SCORES[piece_captured][end_sq]
+    if flag == KING_CASTLE:
+        rook = PIECE_SQUARE_SCORES[piece_moved[0] + "R"]
+        score += rook[end_sq - 1] - rook[end_sq + 1]
+    elif flag == QUEEN_CASTLE:
+        rook = PIECE_SQUARE_SCORES[piece_moved[0] + "R"]
+        score += rook[end_sq + 1] - rook[end_sq - 2]
+    return score
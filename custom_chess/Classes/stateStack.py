@@ -0,0 +1,49 @@
+from array import array
+from custom_chess.Classes.CastleRights import CastleRights
+
+# Everything a move destroys is packed into one 64-bit record per ply: castling bits 0-3, en passant code in
+# bits 4-10, captured piece code in bits 11-14 and the halfmove clock from bit 15 on. Records live in a
+# preallocated array("Q") next to a second one with the Zobrist key of the ply, so undo restores the key as is.
+STATE_STACK_SIZE = 256
+
+WHITE_KING_CASTLE = 1
+WHITE_QUEEN_CASTLE = 2
+BLACK_KING_CASTLE = 4
+BLACK_QUEEN_CASTLE = 8
+ALL_CASTLING = WHITE_KING_CASTLE | WHITE_QUEEN_CASTLE | BLACK_KING_CASTLE | BLACK_QUEEN_CASTLE
+
+# castling bits that survive a move from or to each square
+CASTLE_MASK = [ALL_CASTLING] * 64
+CASTLE_MASK[0] &= ~BLACK_QUEEN_CASTLE
+CASTLE_MASK[4] &= ~(BLACK_KING_CASTLE | BLACK_QUEEN_CASTLE)
+CASTLE_MASK[7] &= ~BLACK_KING_CASTLE
+CASTLE_MASK[56] &= ~WHITE_QUEEN_CASTLE
+CASTLE_MASK[60] &= ~(WHITE_KING_CASTLE | WHITE_QUEEN_CASTLE)
+CASTLE_MASK[63] &= ~WHITE_KING_CASTLE
+
+STATE_PIECES = ("__", "wp", "wN", "wB", "wR", "wQ", "wK", "bp", "bN", "bB", "bR", "bQ", "bK")
+PIECE_CODES = {piece: code for code, piece in enumerate(STATE_PIECES)}
+# code 0 is no en passant square, code sq + 1 the (row, col) square, the tuples are shared and never rebuilt
+ENPASSANT_SQUARES = ((),) + tuple(divmod(sq, 8) for sq in range(64))
+ENPASSANT_CODES = {square: code for code, square in enumerate(ENPASSANT_SQUARES)}
+
+
+def castle_bits(castle_rights: CastleRights) -> int:
+    return (WHITE_KING_CASTLE if castle_rights.white_king_castle else 0) | \
+           (WHITE_QUEEN_CASTLE if castle_rights.white_queen_castle else 0) | \
+           (BLACK_KING_CASTLE if castle_rights.black_king_castle else 0) | \
+           (BLACK_QUEEN_CASTLE if castle_rights.black_queen_castle else 0)
+
+
+def castle_rights(bits: int) -> CastleRights:
+    return CastleRights(bool(bits & WHITE_KING_CASTLE), bool(bits & BLACK_KING_CASTLE),
+                        bool(bits & WHITE_QUEEN_CASTLE), bool(bits & BLACK_QUEEN_CASTLE))
+
+
+def new_stack(size: int = STATE_STACK_SIZE) -> array:
+    return array("Q", bytes(8 * size))
+
+
+def grow_stack(stack: array) -> None:
+    # doubles the stack, only reached by games longer than it and never inside a search of a short one
+    stack.frombytes(bytes(8 * len(stack)))
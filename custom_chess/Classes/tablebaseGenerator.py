@@ -0,0 +1,175 @@
+import os
+from array import array
+from custom_chess.Classes.Tablebase import TABLE_SIZE, TABLE_EXTENSION, table_index, table_name, write_table
+
+# tables a pawn promotes into have to exist first
+GENERATION_ORDER = "QRp"
+ORTHOGONAL = ((-1, 0), (1, 0), (0, -1), (0, 1))
+DIAGONAL = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+PIECE_DIRECTIONS = {"Q": ORTHOGONAL + DIAGONAL, "R": ORTHOGONAL}
+
+
+def ray(square: int, direction: tuple) -> list:
+    row, col = divmod(square, 8)
+    squares = []
+    row, col = row + direction[0], col + direction[1]
+    while 0 <= row < 8 and 0 <= col < 8:
+        squares.append(row * 8 + col)
+        row, col = row + direction[0], col + direction[1]
+    return squares
+
+
+RAYS = {piece: [[ray(square, direction) for direction in directions] for square in range(64)]
+        for piece, directions in PIECE_DIRECTIONS.items()}
+KING_SQUARES = [[square for square in range(64) if square != king and
+                 abs(square // 8 - king // 8) <= 1 and abs(square % 8 - king % 8) <= 1] for king in range(64)]
+ADJACENT = [set(squares) | {king} for king, squares in enumerate(KING_SQUARES)]
+
+
+def attacks(piece: str, square: int, target: int, blocker: int) -> bool:
+    # white's piece on square hits target, the white king on blocker is the only thing that can stand between
+    if piece == "p":
+        return target in (square - 9, square - 7) and abs(target % 8 - square % 8) == 1
+    for line in RAYS[piece][square]:
+        for other in line:
+            if other == target:
+                return True
+            if other == blocker:
+                break
+    return False
+
+
+def legal(piece: str, black_to_move: int, white_king: int, black_king: int, square: int) -> bool:
+    if square in (white_king, black_king) or black_king in ADJACENT[white_king]:
+        return False
+    if piece == "p" and not 8 <= square < 56:
+        return False
+    return black_to_move or not attacks(piece, square, black_king, white_king)
+
+
+def successors(piece: str, black_to_move: int, white_king: int, black_king: int, square: int, tables: dict):
+    # (children inside this table, stored values of children in other tables from the child's side to move)
+    children, outside = [], []
+    if black_to_move:
+        for target in KING_SQUARES[black_king]:
+            if target in ADJACENT[white_king]:
+                continue
+            if target == square:
+                outside.append(0)
+            elif not attacks(piece, square, target, white_king):
+                children.append(table_index(0, white_king, target, square))
+        return children, outside
+    for target in KING_SQUARES[white_king]:
+        if target != square and target not in ADJACENT[black_king]:
+            children.append(table_index(1, target, black_king, square))
+    if piece == "p":
+        target = square - 8
+        if target in (white_king, black_king):
+            return children, outside
+        if target < 8:
+            for promotion in "QR":
+                outside.append(tables[table_name(promotion)][table_index(1, white_king, black_king, target)])
+            outside += [0, 0]
+        else:
+            children.append(table_index(1, white_king, black_king, target))
+            if square >= 48 and target - 8 not in (white_king, black_king):
+                children.append(table_index(1, white_king, black_king, target - 8))
+        return children, outside
+    for line in RAYS[piece][square]:
+        for target in line:
+            if target in (white_king, black_king):
+                break
+            children.append(table_index(1, white_king, black_king, target))
+    return children, outside
+
+
+def predecessors(piece: str, black_to_move: int, white_king: int, black_king: int, square: int):
+    # positions inside the table one move earlier, captures and promotions never lead back into it
+    if not black_to_move:
+        for origin in KING_SQUARES[black_king]:
+            if origin not in (white_king, square) and origin not in ADJACENT[white_king]:
+                yield table_index(1, white_king, origin, square)
+        return
+    for origin in KING_SQUARES[white_king]:
+        if origin not in (black_king, square) and legal(piece, 0, origin, black_king, square):
+            yield table_index(0, origin, black_king, square)
+    if piece == "p":
+        origins = [square + 8] if square + 8 < 56 else []
+        if 32 <= square < 40 and square + 8 not in (white_king, black_king):
+            origins.append(square + 16)
+    else:
+        origins = []
+        for line in RAYS[piece][square]:
+            for origin in line:
+                if origin in (white_king, black_king):
+                    break
+                origins.append(origin)
+    for origin in origins:
+        if origin not in (white_king, black_king) and legal(piece, 0, white_king, black_king, origin):
+            yield table_index(0, white_king, black_king, origin)
+
+
+def generate_table(piece: str, tables: dict = None) -> array:
+    # retrograde analysis: mates first, then every position whose last open move turned out lost (a loss one ply
+    # longer) or which has a move into a loss (a win one ply longer), level by level so distances are minimal
+    tables = tables or {}
+    remaining = array("B", bytes(TABLE_SIZE))
+    distances = array("h", [-1]) * TABLE_SIZE
+    levels = {0: []}
+    outside_wins = {}
+    for index in range(TABLE_SIZE):
+        rest, square = divmod(index, 64)
+        rest, black_king = divmod(rest, 64)
+        black_to_move, white_king = divmod(rest, 64)
+        if not legal(piece, black_to_move, white_king, black_king, square):
+            continue
+        children, outside = successors(piece, black_to_move, white_king, black_king, square, tables)
+        remaining[index] = len(children) + len(outside)
+        for value in outside:
+            if value < 0:
+                levels.setdefault(-value, []).append(index)
+            elif value > 0:
+                outside_wins.setdefault(value, []).append(index)
+        if not children and not outside and black_to_move and attacks(piece, square, black_king, white_king):
+            levels[0].append(index)
+
+    distance = 0
+    while distance <= max(list(levels) + list(outside_wins)):
+        for index in outside_wins.get(distance, ()):
+            remaining[index] -= 1
+            if remaining[index] == 0:
+                levels.setdefault(distance + 1, []).append(index)
+        for index in levels.get(distance, ()):
+            if distances[index] >= 0:
+                continue
+            distances[index] = distance
+            rest, square = divmod(index, 64)
+            rest, black_king = divmod(rest, 64)
+            black_to_move, white_king = divmod(rest, 64)
+            for parent in predecessors(piece, black_to_move, white_king, black_king, square):
+                if distance % 2 == 0:
+                    levels.setdefault(distance + 1, []).append(parent)
+                else:
+                    remaining[parent] -= 1
+                    if remaining[parent] == 0:
+                        levels.setdefault(distance + 1, []).append(parent)
+        distance += 1
+
+    values = array("b", bytes(TABLE_SIZE))
+    for index in range(TABLE_SIZE):
+        if distances[index] >= 0:
+            values[index] = distances[index] if distances[index] % 2 else -distances[index] - 1
+    return values
+
+
+def generate_tables(directory: str, report=print) -> dict:
+    os.makedirs(directory, exist_ok=True)
+    tables = {}
+    for piece in GENERATION_ORDER:
+        tables[table_name(piece)] = generate_table(piece, tables)
+        path = os.path.join(directory, table_name(piece) + TABLE_EXTENSION)
+        write_table(path, tables[table_name(piece)])
+        if report is not None:
+            report(f"{table_name(piece)}: {os.path.getsize(path)} bytes, longest mate "
+                   f"{max(tables[table_name(piece)])} plies")
+    return tables
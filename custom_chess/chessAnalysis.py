@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import Process, Queue
+from queue import Empty, Full
+from custom_chess.Classes.chessEngine import Gamestate
+from custom_chess.Classes.MoveClass import Move
+from custom_chess.Classes.TimeManager import TimeManager
+from custom_chess.Classes.chessNotation import START_FEN, parse_san, read_pgn
+from custom_chess.Classes import chessIA
+
+ANALYSIS_DEPTH = 3
+# games queued per worker, the reader waits when they are all taken so memory stays flat on any archive size
+GAMES_PER_WORKER = 2
+# seconds between checks that the workers are still alive while waiting on them
+POLL_INTERVAL = 0.5
+
+
+def analyse_game(tags: dict, moves: list, depth: int = ANALYSIS_DEPTH, movetime: float = None,
+                 searcher: chessIA.Searcher = None) -> list:
+    # one record per position before each move and after the last one, scores in centipawns from white's side
+    if searcher is None:
+        searcher = chessIA.Searcher()
+    gamestate = Gamestate.from_fen(tags.get("FEN", START_FEN))
+    positions = []
+    for ply, san in enumerate(moves + [None]):
+        validmoves = gamestate.get_valid_moves_efficient()
+        record = {"ply": ply, "fen": gamestate.to_fen()}
+        if validmoves:
+            timer = TimeManager.from_movetime(movetime) if movetime else None
+            stats = searcher.search_with_stats(gamestate, validmoves, depth, timer)
+            if stats.bestMove is not None:
+                record["best"] = Move.from_code(stats.bestMove, gamestate.board).get_chess_notation()
+            if stats.score is not None:
+                record["score"] = stats.score * (1 if gamestate.whiteToMove else -1)
+                record["depth"] = stats.depth
+                record["nodes"] = stats.nodes
+        if san is not None:
+            move = parse_san(gamestate, san, validmoves)
+            record["played"] = san
+            gamestate.make_move(move)
+        positions.append(record)
+    return positions
+
+
+def run_analysis_worker(tasks: Queue, results: Queue, depth: int, movetime: float):
+    # one searcher per worker, its tables carry over from game to game
+    searcher = chessIA.Searcher()
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        index, tags, moves = task
+        try:
+            results.put({"game": index, "tags": tags, "positions": analyse_game(tags, moves, depth, movetime, searcher)})
+        except Exception as error:
+            # a move that cannot be played or any other failure gives the game an error line instead of taking the
+            # worker and its queued games down with it
+            results.put({"game": index, "tags": tags, "error": f"{type(error).__name__}: {error}"})
+
+
+def put_task(tasks: Queue, task, workers: list) -> bool:
+    # False once every worker is gone, nothing would ever take the task off the queue
+    while True:
+        try:
+            tasks.put(task, timeout=POLL_INTERVAL)
+            return True
+        except Full:
+            if not any(worker.is_alive() for worker in workers):
+                return False
+
+
+def get_result(results: Queue, workers: list):
+    # None once every worker is gone and nothing is left on the queue
+    while True:
+        try:
+            return results.get(timeout=POLL_INTERVAL)
+        except Empty:
+            if not any(worker.is_alive() for worker in workers):
+                try:
+                    return results.get(False)
+                except Empty:
+                    return None
+
+
+def analyse_pgn(source, output, processes: int = 1, depth: int = ANALYSIS_DEPTH, movetime: float = None) -> int:
+    # fans games out to worker processes and writes one JSON line per game as soon as it is done, so the lines
+    # come in completion order and carry the game's index in the file
+    tasks = Queue(GAMES_PER_WORKER * processes)
+    results = Queue()
+    workers = [Process(target=run_analysis_worker, args=(tasks, results, depth, movetime), daemon=True)
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    sent = written = 0
+
+    def write(result):
+        nonlocal written
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+        written += 1
+
+    for index, (tags, moves) in enumerate(read_pgn(source)):
+        if not put_task(tasks, (index, tags, moves), workers):
+            break
+        sent += 1
+        while written < sent:
+            try:
+                write(results.get(False))
+            except Empty:
+                break
+    for _ in workers:
+        if not put_task(tasks, None, workers):
+            break
+    while written < sent:
+        result = get_result(results, workers)
+        if result is None:
+            break
+        write(result)
+    for worker in workers:
+        worker.join()
+    if any(worker.exitcode for worker in workers):
+        print(f"a worker died, {sent - written} queued games were not analysed", file=sys.stderr)
+    return written
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Search every position of the games in a PGN file")
+    parser.add_argument("pgn")
+    parser.add_argument("--output", default="-", help="JSON lines file, - for stdout")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--depth", type=int, default=ANALYSIS_DEPTH)
+    parser.add_argument("--movetime", type=float, help="seconds per position on top of the depth limit")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.output == "-":
+        games = analyse_pgn(args.pgn, sys.stdout, args.processes, args.depth, args.movetime)
+    else:
+        with open(args.output, "w") as output:
+            games = analyse_pgn(args.pgn, output, args.processes, args.depth, args.movetime)
+    print(f"{games} games in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
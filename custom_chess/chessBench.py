@@ -0,0 +1,198 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from custom_chess.Classes.chessEngine import Gamestate
+from custom_chess.Classes.MoveClass import Move
+from custom_chess.Classes.LazySMP import LazySMP
+from custom_chess.Classes import chessIA
+
+BENCH_SEED = 1234
+REGRESSION_THRESHOLD = 0.10
+# timing noise between runs is well above the node count's, which does not change at all
+NPS_THRESHOLD = 0.25
+# each position is timed this many times and the fastest one kept
+REPETITIONS = 3
+# runs shorter than this in seconds are not timed precisely enough to compare their nps
+MIN_TIMED = 1.0
+DEFAULT_BASELINE = "./custom_chess/bench_baseline.json"
+# openings, middlegames with tactics and endgames, searched from the same seed every run
+BENCH_POSITIONS = [
+    ("start", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"),
+    ("italian", "r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"),
+    ("wac1", "2rr3k/pp3pp1/1nnqbN1p/3pN3/2pP4/2P3Q1/PPB4P/R4RK1 w - - 0 1"),
+    ("wac2", "r1b1k2r/ppppnppp/2n2q2/2b5/3NP3/2P1B3/PP3PPP/RN1QKB1R w KQkq - 3 9"),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1"),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10"),
+    ("rook_ending", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"),
+]
+# name: (move finder taking a searcher, the position, its moves and a depth, default depth), the unpruned searches
+# get a shallower default so a full run stays around a minute
+STRATEGIES = {
+    "random": (lambda searcher, gamestate, validmoves, depth: chessIA.find_random(validmoves), 0),
+    "greedy": (lambda searcher, gamestate, validmoves, depth: searcher.find_better_move_greedy(gamestate, validmoves),
+               2),
+    "minmax": (chessIA.Searcher.find_move_minmax, 2),
+    "negamax": (chessIA.Searcher.find_bestmove_negamax, 2),
+    # what find_move_nega_alphabeta runs, without its time limit
+    "alphabeta": (chessIA.Searcher.find_move_iterative, 4),
+    "pvs": (lambda searcher, gamestate, validmoves, depth: searcher.find_move_iterative(gamestate, validmoves, depth,
+                                                                                        use_pvs=True), 4),
+}
+# the strategy the others' moves are compared with
+REFERENCE_STRATEGY = "alphabeta"
+
+
+def run_strategy(name: str, depth: int, positions: list = None, repetitions: int = REPETITIONS) -> dict:
+    finder = STRATEGIES[name][0]
+    searcher = chessIA.Searcher()
+    result = {"depth": depth, "nodes": 0, "time": 0.0, "moves": {}}
+    for label, fen in positions or BENCH_POSITIONS:
+        gamestate = Gamestate.from_fen(fen)
+        validmoves = gamestate.get_valid_moves_efficient()
+        # every repetition starts from the same seed, empty tables and move order (the root search reorders the
+        # list it is given), so only the time differs between them
+        best_time = float("inf")
+        for _ in range(max(1, repetitions)):
+            random.seed(BENCH_SEED)
+            searcher.clear_search_tables()
+            searcher.nodes = 0
+            start = time.perf_counter()
+            move = finder(searcher, gamestate, validmoves[:], depth)
+            best_time = min(best_time, time.perf_counter() - start)
+        result["time"] += best_time
+        result["nodes"] += searcher.nodes
+        result["moves"][label] = Move.from_code(move, gamestate.board).get_chess_notation() if move else None
+    result["time"] = round(result["time"], 4)
+    result["nps"] = int(result["nodes"] / max(result["time"], 1e-6))
+    return result
+
+
+def run_threads(threads: int, depth: int, positions: list = None, repetitions: int = REPETITIONS) -> dict:
+    # time to reach the depth with the reference search run through LazySMP, the main process alone for 1 thread
+    searcher = chessIA.Searcher()
+    smp = LazySMP(searcher, threads) if threads > 1 else None
+    result = {"threads": threads, "depth": depth, "time": 0.0, "moves": {}}
+    try:
+        for label, fen in positions or BENCH_POSITIONS:
+            gamestate = Gamestate.from_fen(fen)
+            validmoves = gamestate.get_valid_moves_efficient()
+            best_time = float("inf")
+            for _ in range(max(1, repetitions)):
+                random.seed(BENCH_SEED)
+                searcher.clear_search_tables()
+                start = time.perf_counter()
+                if smp is not None:
+                    move = smp.search(gamestate, validmoves[:], depth, fen=fen)
+                else:
+                    move = searcher.find_move_iterative(gamestate, validmoves[:], depth)
+                best_time = min(best_time, time.perf_counter() - start)
+            result["time"] += best_time
+            result["moves"][label] = Move.from_code(move, gamestate.board).get_chess_notation() if move else None
+    finally:
+        if smp is not None:
+            smp.close()
+    result["time"] = round(result["time"], 4)
+    return result
+
+
+def find_slower_threads(runs: list, threshold: float) -> list:
+    # thread counts that take longer than one thread to reach the same depth, beyond the threshold
+    single = next((run for run in runs if run["threads"] == 1), None)
+    if single is None:
+        return []
+    return [f"{run['threads']} threads: {single['time']:.3f}s -> {run['time']:.3f}s" for run in runs
+            if run["time"] > single["time"] * (1 + threshold)]
+
+
+def agreement(moves: dict, reference: dict) -> float:
+    return sum(moves[label] == reference.get(label) for label in moves) / max(len(moves), 1)
+
+
+def find_regressions(results: dict, baseline: dict, threshold: float, nps_threshold: float = NPS_THRESHOLD) -> list:
+    # more nodes for the same depth beyond the threshold or fewer nodes per second beyond the nps one than the
+    # baseline. Runs at another depth are not comparable and are skipped, runs too short to time only compare nodes.
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None or base["depth"] != result["depth"]:
+            continue
+        if base["nodes"] and result["nodes"] > base["nodes"] * (1 + threshold):
+            regressions.append(f"{name}: nodes {base['nodes']} -> {result['nodes']}")
+        if min(base["time"], result["time"]) >= MIN_TIMED and result["nps"] < base["nps"] * (1 - nps_threshold):
+            regressions.append(f"{name}: nps {base['nps']} -> {result['nps']}")
+    return regressions
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare the chessIA move finders on a fixed position suite")
+    parser.add_argument("strategies", nargs="*", help=f"any of {', '.join(STRATEGIES)}, all of them by default")
+    parser.add_argument("--depth", type=int, help="search depth for every strategy that takes one")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="JSON file of an earlier run to flag regressions against, nps only compares on the "
+                             "machine it was made on")
+    parser.add_argument("--save", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="relative change in nodes counted as a regression")
+    parser.add_argument("--nps-threshold", type=float, default=NPS_THRESHOLD,
+                        help="relative drop in nps counted as a regression")
+    parser.add_argument("--repeat", type=int, default=REPETITIONS,
+                        help="times each position is searched, the fastest one is timed")
+    parser.add_argument("--threads", type=int, nargs="+",
+                        help="also time the reference search to its depth with each of these thread counts, 1 is "
+                             "added as the count the others are compared with")
+    args = parser.parse_args(argv)
+    names = args.strategies or list(STRATEGIES)
+    for name in names:
+        if name not in STRATEGIES:
+            parser.error(f"unknown strategy {name}")
+
+    baseline = None
+    if os.path.isfile(args.baseline) and not args.save:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    results = {}
+    for name in names:
+        depth = STRATEGIES[name][1] if args.depth is None or name in ("random", "greedy") else args.depth
+        results[name] = run_strategy(name, depth, repetitions=args.repeat)
+    # the reference moves of the baseline stand in when the reference strategy was not run
+    reference = results.get(REFERENCE_STRATEGY) or (baseline or {}).get(REFERENCE_STRATEGY)
+    for name, result in results.items():
+        same = f"{agreement(result['moves'], reference['moves']):6.0%}" if reference else "     -"
+        print(f"{name:<10} depth {result['depth']}  nodes {result['nodes']:>9}  {result['time']:8.3f}s  "
+              f"{result['nps']:>8} nps  agreement {same}")
+
+    status = 0
+    if baseline is not None:
+        for name, result in results.items():
+            if name in baseline:
+                changed = [label for label, move in result["moves"].items()
+                           if baseline[name]["moves"].get(label) != move]
+                if changed:
+                    print(f"{name}: best move changed in {', '.join(changed)}")
+        regressions = find_regressions(results, baseline, args.threshold, args.nps_threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        status = 1 if regressions else 0
+    if args.threads:
+        depth = STRATEGIES[REFERENCE_STRATEGY][1] if args.depth is None else args.depth
+        runs = [run_threads(threads, depth, repetitions=args.repeat) for threads in sorted({1, *args.threads})]
+        for run in runs:
+            print(f"{REFERENCE_STRATEGY:<10} depth {run['depth']}  threads {run['threads']:>3}  {run['time']:8.3f}s  "
+                  f"speedup {runs[0]['time'] / max(run['time'], 1e-6):5.2f}")
+        slower = find_slower_threads(runs, args.nps_threshold)
+        for line in slower:
+            print(f"SLOWER {line}")
+        status = status or (1 if slower else 0)
+    if args.save:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=1)
+        print(f"baseline written to {args.baseline}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
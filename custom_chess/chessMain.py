@@ -1,11 +1,8 @@
+import os
 import pygame as p
-from multiprocessing import Process, Queue
 from custom_chess.Classes import chessEngine
 from custom_chess.Classes.MoveClass import Move
-from custom_chess.Classes.chessIA import find_random
-from custom_chess.Classes.chessIA import find_better_move_greedy
-from custom_chess.Classes.chessIA import find_bestmove_negamax
-from custom_chess.Classes.chessIA import find_move_nega_alphabeta
+from custom_chess.Classes.SearchWorker import SearchWorker
 
 
 p.init()
@@ -17,6 +14,10 @@ dimension = 8
 sqSize = board_height // dimension
 maxFPS = 30
 Images = {}
+# an optional Polyglot opening book, the AI searches every move when the file is missing
+BOOK_PATH = "./custom_chess/books/book.bin"
+# endgame tables written by chessTablebase.py, probed once three pieces are left
+TABLEBASE_PATH = "./custom_chess/tablebases"
 
 
 def loadImages():
@@ -32,6 +33,8 @@ def main():
     screen.fill(p.Color("white"))
     gs = chessEngine.Gamestate()
     valid_moves = gs.get_valid_moves_efficient()
+    valid_move_views = [Move.from_code(code, gs.board) for code in valid_moves]
+    move_log_views: list[Move] = []
     move_made = False
     animate = False
     move_log_font = p.font.SysFont("Arial", 12, True, False)
@@ -43,7 +46,8 @@ def main():
     player_white = True
     player_black = False
     ia_thinking = False
-    move_finder_process = None
+    search_worker = SearchWorker(book_path=BOOK_PATH if os.path.isfile(BOOK_PATH) else None,
+                                 tablebase_path=TABLEBASE_PATH if os.path.isdir(TABLEBASE_PATH) else None)
     while running:
         human_turn = (gs.whiteToMove and player_white) or (not gs.whiteToMove and player_black)
         for e in p.event.get():
@@ -63,18 +67,25 @@ def main():
                     if len(player_clicks) == 2:
                         move = Move(player_clicks[0], player_clicks[1], gs.board)
                         print(move.get_chess_notation())
-                        for i in range(len(valid_moves)):
-                            if move == valid_moves[i]:
+                        for i in range(len(valid_move_views)):
+                            if move == valid_move_views[i]:
+                                # promotions share their squares, the queen is generated first
                                 gs.make_move(valid_moves[i])
+                                move_log_views.append(valid_move_views[i])
                                 move_made = True
                                 sq_selected = ()
                                 player_clicks = []
                                 animate = True
+                                break
                         if not move_made:
                             player_clicks = [sq_selected]
             elif e.type == p.KEYDOWN:
                 if e.key == p.K_z:
+                    search_worker.stop()
+                    ia_thinking = False
                     gs.undo_move()
+                    if move_log_views:
+                        move_log_views.pop()
                     move_made = True
                     animate = False
                     game = True
@@ -82,8 +93,12 @@ def main():
                     player_clicks = []
 
                 if e.key == p.K_F1:
+                    search_worker.new_game()
+                    ia_thinking = False
                     gs = chessEngine.Gamestate()
                     valid_moves = gs.get_valid_moves_efficient()
+                    valid_move_views = [Move.from_code(code, gs.board) for code in valid_moves]
+                    move_log_views = []
                     sq_selected = ()
                     player_clicks = []
                     move_made = False
@@ -93,19 +108,15 @@ def main():
         if game and not human_turn:
             if not ia_thinking:
                 ia_thinking = True
-                decision_queue = Queue()
-                decision_queue.empty()
-                move_finder_process = Process(target=find_move_nega_alphabeta, args=(gs, valid_moves, decision_queue))
-                move_finder_process.start()
-            if not move_finder_process.is_alive():
-                ia_choice = decision_queue.get()
+                search_worker.search(gs)
+            message = search_worker.poll()
+            if message is not None and message[0] == "bestmove":
+                ia_choice = message[1]
                 # ia_choice = find_random(valid_moves)
                 # ia_choice = find_better_move_greedy(gs, valid_moves)
                 # ia_choice = find_bestmove_negamax(gs, valid_moves)
                 # ia_choice = find_move_nega_alphabeta(gs, valid_moves)
-                if ia_choice is None:
-                    print("random")
-                    ia_choice = find_random(valid_moves)
+                move_log_views.append(Move.from_code(ia_choice, gs.board))
                 gs.make_move(ia_choice)
                 move_made = True
                 animate = True
@@ -113,15 +124,16 @@ def main():
 
         if move_made:
             if animate:
-                animating_move(gs.moveLog[-1], screen, gs.board, clock)
+                animating_move(move_log_views[-1], screen, gs.board, clock)
             valid_moves = gs.get_valid_moves_efficient()
+            valid_move_views = [Move.from_code(code, gs.board) for code in valid_moves]
             move_made = False
             animate = False
             sq_selected = ()
             player_clicks = []
             print(gs.board)
 
-        draw_game_state(screen, gs, valid_moves, sq_selected, move_log_font=move_log_font)
+        draw_game_state(screen, gs, valid_move_views, move_log_views, sq_selected, move_log_font=move_log_font)
         if gs.checkmate or gs.stalemate:
             game = False
             if gs.whiteToMove and gs.checkmate:
@@ -134,6 +146,7 @@ def main():
 
         clock.tick(maxFPS)
         p.display.flip()
+    search_worker.close()
 
 
 def highlight_squares(screen, gamestate, validmoves, sqselected):
@@ -167,11 +180,10 @@ def draw_end_ext(screen, text):
     screen.blit(text_object, text_location)
 
 
-def draw_move_log(screen, gs, move_log_font):
+def draw_move_log(screen, move_log_views, move_log_font):
     move_log_area = p.Rect(board_width, 0, move_panel_width, move_panel_height)
     p.draw.rect(screen, p.Color("white"), move_log_area)
-    movelog: list[Move] = gs.moveLog
-    move_text: list[Move] = movelog
+    move_text: list[Move] = move_log_views
     padding = 5
     test_y = padding
     for i in range(len(move_text)):
@@ -185,11 +197,11 @@ def draw_move_log(screen, gs, move_log_font):
         test_y += text_object.get_height()
 
 
-def draw_game_state(screen, gs, valid_moves, sq_seleted, move_log_font):
+def draw_game_state(screen, gs, valid_moves, move_log_views, sq_seleted, move_log_font):
     draw_board(screen)
     highlight_squares(screen, gs, valid_moves, sq_seleted)
     draw_pieces(screen, gs.board)
-    draw_move_log(screen, gs, move_log_font)
+    draw_move_log(screen, move_log_views, move_log_font)
 
 
 def draw_board(screen):
@@ -0,0 +1,133 @@
+import argparse
+import sys
+import time
+from custom_chess.Classes.chessEngine import Gamestate
+from custom_chess.Classes.bitboardEngine import BitboardGamestate
+from custom_chess.Classes.MoveClass import Move
+from custom_chess.Classes.chessNotation import read_epd
+
+# Standard perft positions with their published node counts for depth 1, 2, 3, ...
+PERFT_POSITIONS = [
+    ("start", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", [48, 2039, 97862, 4085603]),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2812, 43238, 674624]),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", [6, 264, 9467, 422333]),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", [44, 1486, 62379, 2103487]),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+ENGINES = {"gamestate": Gamestate, "bitboard": BitboardGamestate}
+
+
+def perft(gamestate, depth: int) -> int:
+    if depth == 0:
+        return 1
+    moves = gamestate.get_valid_moves_efficient()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        gamestate.make_move(move)
+        nodes += perft(gamestate, depth - 1)
+        gamestate.undo_move()
+    return nodes
+
+
+def divide(gamestate, depth: int) -> dict:
+    counts = {}
+    for move in gamestate.get_valid_moves_efficient():
+        notation = Move.from_code(move, gamestate.board).get_chess_notation()
+        gamestate.make_move(move)
+        counts[notation] = perft(gamestate, depth - 1)
+        gamestate.undo_move()
+    return counts
+
+
+def compare_generators(gamestate, reference: Gamestate, depth: int, path: list = None) -> list:
+    # walk the tree and report every node where the efficient generator of either engine disagrees with the naive
+    # one of Gamestate, run on reference which is kept on the same position
+    if path is None:
+        path = []
+    differences = []
+    efficient = set(gamestate.get_valid_moves_efficient())
+    naive = set(reference.get_valid_moves_naive())
+    if efficient != naive:
+        differences.append((" ".join(path),
+                            sorted(Move.from_code(m, gamestate.board).get_chess_notation() for m in efficient - naive),
+                            sorted(Move.from_code(m, gamestate.board).get_chess_notation() for m in naive - efficient)))
+    if depth > 1:
+        for move in naive:
+            path.append(Move.from_code(move, gamestate.board).get_chess_notation())
+            gamestate.make_move(move)
+            reference.make_move(move)
+            differences += compare_generators(gamestate, reference, depth - 1, path)
+            reference.undo_move()
+            gamestate.undo_move()
+            path.pop()
+    return differences
+
+
+def read_perft_epd(path: str):
+    # the usual perft suite layout: a FEN followed by ;D1 20 ;D2 400 ... operations
+    for number, (fen, operations) in enumerate(read_epd(path), 1):
+        counts = []
+        while f"D{len(counts) + 1}" in operations:
+            counts.append(int(operations[f"D{len(counts) + 1}"]))
+        yield operations.get("id", f"epd{number}"), fen, counts
+
+
+def run_suite(engine, max_depth: int, positions: list = None) -> int:
+    failures = 0
+    for name, fen, counts in positions or PERFT_POSITIONS:
+        for depth in range(1, min(max_depth, len(counts)) + 1):
+            gamestate = engine.from_fen(fen)
+            start = time.perf_counter()
+            nodes = perft(gamestate, depth)
+            elapsed = time.perf_counter() - start
+            status = "ok"
+            if nodes != counts[depth - 1]:
+                status = f"FAIL expected {counts[depth - 1]}"
+                failures += 1
+            print(f"{name:<10} depth {depth}  nodes {nodes:>9}  {elapsed:8.3f}s  "
+                  f"{nodes / max(elapsed, 1e-9):>10.0f} nps  {status}")
+    return failures
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Perft node counts and move generator checks")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="gamestate")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--fen", help="run divide on this position instead of the bundled suite")
+    parser.add_argument("--epd", help="run the perft suite in this EPD file instead of the bundled one")
+    parser.add_argument("--compare", action="store_true",
+                        help="diff get_valid_moves_efficient of the engine against the naive generator of "
+                             "gamestate on every node")
+    args = parser.parse_args(argv)
+    engine = ENGINES[args.engine]
+
+    if args.compare:
+        mismatches = 0
+        for name, fen, counts in ([("fen", args.fen, [])] if args.fen else PERFT_POSITIONS):
+            differences = compare_generators(engine.from_fen(fen), Gamestate.from_fen(fen), args.depth)
+            for path, only_efficient, only_naive in differences:
+                mismatches += 1
+                print(f"{name}: after [{path}] efficient only {only_efficient}, naive only {only_naive}")
+        print(f"{mismatches} mismatching nodes")
+        return 1 if mismatches else 0
+
+    if args.fen:
+        gamestate = engine.from_fen(args.fen)
+        start = time.perf_counter()
+        counts = divide(gamestate, args.depth)
+        elapsed = time.perf_counter() - start
+        for notation in sorted(counts):
+            print(f"{notation}: {counts[notation]}")
+        nodes = sum(counts.values())
+        print(f"nodes {nodes}  {elapsed:.3f}s  {nodes / max(elapsed, 1e-9):.0f} nps")
+        return 0
+
+    return 1 if run_suite(engine, args.depth, read_perft_epd(args.epd) if args.epd else None) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,49 @@
+import argparse
+import sys
+import time
+from custom_chess.Classes.chessEngine import Gamestate
+from custom_chess.Classes.MoveClass import Move
+from custom_chess.Classes.Tablebase import Tablebase
+from custom_chess.Classes.tablebaseGenerator import generate_tables
+from custom_chess.Classes import chessIA
+
+DEFAULT_DIRECTORY = "./custom_chess/tablebases"
+
+
+def describe(value: int) -> str:
+    if value > 0:
+        return f"win, mate in {value} plies"
+    if value < 0:
+        return f"loss, mated in {-value - 1} plies"
+    return "draw"
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate and probe the KQK, KRK and KPK endgame tables")
+    parser.add_argument("--directory", default=DEFAULT_DIRECTORY)
+    parser.add_argument("--fen", help="probe this position instead of generating the tables")
+    args = parser.parse_args(argv)
+
+    if args.fen:
+        tablebase = Tablebase(args.directory)
+        gamestate = Gamestate.from_fen(args.fen)
+        value = tablebase.probe(gamestate)
+        if value is None:
+            print("no table for this position")
+            return 1
+        print(describe(value))
+        searcher = chessIA.Searcher(0)
+        searcher.tablebase = tablebase
+        root = searcher.probe_root(gamestate, gamestate.get_valid_moves_efficient())
+        if root is not None:
+            print(f"best move {Move.from_code(root[0], gamestate.board).get_chess_notation()}")
+        return 0
+
+    start = time.perf_counter()
+    generate_tables(args.directory)
+    print(f"done in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
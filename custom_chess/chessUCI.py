@@ -0,0 +1,228 @@
+import sys
+import threading
+from custom_chess.Classes.chessEngine import Gamestate
+from custom_chess.Classes.MoveClass import Move
+from custom_chess.Classes.chessNotation import line_notation
+from custom_chess.Classes.TranspositionTable import TranspositionTable
+from custom_chess.Classes.TimeManager import TimeManager, DEFAULT_MOVES_TO_GO
+from custom_chess.Classes.LazySMP import LazySMP
+from custom_chess.Classes import chessIA
+
+ENGINE_NAME = "ChessV1"
+ENGINE_AUTHOR = "CarlosChapa947"
+MAX_DEPTH = 64
+MAX_THREADS = 64
+
+
+def uci_score(score: int, pv: list, depth: int) -> str:
+    # mates found by the search count their moves along the principal variation (the depth when it is lost),
+    # tablebase ones add the distance stored in the table at the end of it
+    if abs(score) >= chessIA.CHECKMATE:
+        plies = len(pv) or depth
+    elif abs(score) > chessIA.TABLEBASE_WIN - chessIA.TABLEBASE_MAX_PLIES:
+        plies = len(pv) + chessIA.TABLEBASE_WIN - abs(score)
+    else:
+        return f"cp {score}"
+    moves = (plies + 1) // 2
+    return f"mate {moves if score > 0 else -moves}"
+
+
+def find_uci_move(gamestate: Gamestate, text: str):
+    for code in gamestate.get_valid_moves_efficient():
+        if Move.from_code(code, gamestate.board).get_chess_notation() == text:
+            return code
+    return None
+
+
+class UCIEngine:
+
+    def __init__(self, output=sys.stdout):
+        self.output = output
+        self.gamestate = Gamestate()
+        self.fen = None
+        self.threads = 1
+        self.usePVS = False
+        self.hashSize = chessIA.TT_SIZE_MB
+        self.searcher = chessIA.Searcher(self.hashSize)
+        self.smp = None
+        self.searchThread = None
+        self.stopEvent = threading.Event()
+        self.outputLock = threading.Lock()
+
+    def send(self, line: str):
+        with self.outputLock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def handle(self, line: str) -> bool:
+        tokens = line.split()
+        if not tokens:
+            return True
+        command = tokens[0]
+        if command == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send(f"option name Hash type spin default {chessIA.TT_SIZE_MB} min 1 max 1024")
+            self.send(f"option name Threads type spin default 1 min 1 max {MAX_THREADS}")
+            self.send("option name PVS type check default false")
+            self.send("option name BookFile type string default <empty>")
+            self.send("option name TablebasePath type string default <empty>")
+            self.send("option name SearchStats type check default true")
+            self.send("option name StatsLog type string default <empty>")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "setoption":
+            self.set_option(tokens[1:])
+        elif command == "ucinewgame":
+            self.stop()
+            self.gamestate = Gamestate()
+            self.fen = None
+            self.searcher.transpositionTable.clear()
+        elif command == "position":
+            self.stop()
+            self.set_position(tokens[1:])
+        elif command == "go":
+            self.stop()
+            self.go(tokens[1:])
+        elif command == "stop":
+            self.stop()
+        elif command == "quit":
+            self.stop()
+            if self.smp is not None:
+                self.smp.close()
+            return False
+        return True
+
+    def set_option(self, tokens: list):
+        if "name" not in tokens or "value" not in tokens:
+            return
+        name = " ".join(tokens[tokens.index("name") + 1:tokens.index("value")])
+        value = " ".join(tokens[tokens.index("value") + 1:])
+        if name.lower() == "pvs":
+            self.usePVS = value.lower() == "true"
+            return
+        if name.lower() == "searchstats":
+            self.stop()
+            self.searcher.collectStats = value.lower() == "true"
+            return
+        if name.lower() == "statslog":
+            self.stop()
+            self.searcher.open_stats_log(None if value in ("", "<empty>") else value)
+            return
+        if name.lower() == "bookfile":
+            self.stop()
+            self.searcher.load_opening_book(None if value in ("", "<empty>") else value)
+            return
+        if name.lower() in ("hash", "threads") and not value.isdigit():
+            self.send(f"info string bad value {value} for {name}")
+            return
+        if name.lower() == "hash":
+            self.hashSize = max(1, int(value))
+        elif name.lower() == "threads":
+            self.threads = min(max(1, int(value)), MAX_THREADS)
+        elif name.lower() != "tablebasepath":
+            return
+        self.stop()
+        if name.lower() == "tablebasepath":
+            # helpers load the tables when they start, so they are restarted below
+            self.searcher.load_tablebase(None if value in ("", "<empty>") else value)
+        if self.smp is not None:
+            self.smp.close()
+            self.smp = None
+        if self.threads > 1:
+            self.smp = LazySMP(self.searcher, self.threads, self.hashSize)
+        else:
+            self.searcher.transpositionTable = TranspositionTable(self.hashSize)
+
+    def set_position(self, tokens: list):
+        if not tokens:
+            return
+        if "moves" in tokens:
+            moves = tokens[tokens.index("moves") + 1:]
+            tokens = tokens[:tokens.index("moves")]
+        else:
+            moves = []
+        if tokens[0] == "startpos":
+            fen = None
+            gamestate = Gamestate()
+        elif tokens[0] == "fen":
+            fen = " ".join(tokens[1:])
+            gamestate = Gamestate.from_fen(fen)
+        else:
+            return
+        for text in moves:
+            code = find_uci_move(gamestate, text)
+            if code is None:
+                self.send(f"info string illegal move {text}")
+                break
+            gamestate.make_move(code)
+        self.fen = fen
+        self.gamestate = gamestate
+
+    def go(self, tokens: list):
+        limits = {}
+        for i, token in enumerate(tokens[:-1]):
+            if token in ("depth", "movetime", "wtime", "btime", "winc", "binc", "movestogo"):
+                try:
+                    limits[token] = int(tokens[i + 1])
+                except ValueError:
+                    self.send(f"info string bad value {tokens[i + 1]} for {token}")
+        max_depth = limits.get("depth", MAX_DEPTH)
+        self.stopEvent.clear()
+        if "movetime" in limits:
+            timer = TimeManager.from_movetime(limits["movetime"] / 1000, self.stopEvent)
+        elif "wtime" in limits or "btime" in limits:
+            side = "w" if self.gamestate.whiteToMove else "b"
+            timer = TimeManager.from_clock(limits.get(side + "time", 0) / 1000, limits.get(side + "inc", 0) / 1000,
+                                           limits.get("movestogo", DEFAULT_MOVES_TO_GO), self.stopEvent)
+        else:
+            timer = TimeManager(stop_event=self.stopEvent)
+            if "depth" not in limits and "infinite" not in tokens:
+                max_depth = chessIA.DEPTH
+        self.searchThread = threading.Thread(target=self.search, args=(max_depth, timer, "infinite" in tokens),
+                                             daemon=True)
+        self.searchThread.start()
+
+    def search(self, max_depth: int, timer: TimeManager, infinite: bool = False):
+        validmoves = self.gamestate.get_valid_moves_efficient()
+        best_move = None
+        if validmoves:
+            if self.smp is not None:
+                best_move = self.smp.search(self.gamestate, validmoves, max_depth, timer, self.send_info, self.fen,
+                                            self.usePVS)
+            else:
+                best_move = self.searcher.find_move_iterative(self.gamestate, validmoves, max_depth, timer,
+                                                              info_callback=self.send_info, use_pvs=self.usePVS)
+        if infinite:
+            # go infinite only answers stop, however early the search itself ended
+            self.stopEvent.wait()
+        if best_move is None:
+            self.send("bestmove 0000")
+        else:
+            self.send(f"bestmove {Move.from_code(best_move, self.gamestate.board).get_chess_notation()}")
+
+    def send_info(self, depth: int, score: int, nodes: int, elapsed: float, pv: list):
+        notation = line_notation(self.gamestate, pv)
+        self.send(f"info depth {depth} score {uci_score(score, pv, depth)} nodes {nodes} "
+                  f"nps {int(nodes / max(elapsed, 1e-3))} time {int(elapsed * 1000)} pv {' '.join(notation)}")
+
+    def stop(self):
+        self.stopEvent.set()
+        self.wait()
+
+    def wait(self):
+        if self.searchThread is not None:
+            self.searchThread.join()
+            self.searchThread = None
+
+
+def main():
+    engine = UCIEngine()
+    for line in sys.stdin:
+        if not engine.handle(line):
+            break
+
+
+if __name__ == '__main__':
+    main()